@@ -1,30 +1,36 @@
 import streamlit as st
-import google.generativeai as genai
-import streamlit.components.v1 as components 
-from PIL import Image
 import datetime
-import time
-import qrcode
-import io
-import base64
+import hashlib
 import json
-from typing import Dict, List, Optional
-import re
-import traceback # 상세 에러 확인을 위한 모듈
-import textwrap # 긴 텍스트 줄바꿈을 위해 추가
-from PIL import Image, ImageDraw, ImageFont, ImageColor
-
-
-# [추가] 공유 및 이미지 생성
-class ShareManager:
-    def __init__(self):
-        pass
-
-    # [코드 최상단 import 영역에 추가]
-from PIL import Image, ImageDraw, ImageFont, ImageColor
-import textwrap
-import io
+import os
 import re
+import secrets
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Tuple
+
+# 무거운 하위 시스템(LLM SDK, QR, 카드 렌더링/PIL)은 처음 쓸 때 불러옵니다.
+# 랜딩 페이지(0단계)는 아래의 가벼운 모듈만 있으면 되고, 나머지는 1단계부터 백그라운드에서 준비합니다.
+from mindscan.render_pool import RenderQueueFull
+from mindscan.qr_service import qr_service
+from mindscan.json_stream import JSONFieldStream
+from mindscan.chat_messages import ChatMessage, bot_bubble_html
+from mindscan.model_backends import model_registry
+from mindscan.response_decoder import CHAT_GENERATION_CONFIG, decode_chat_reply, decoder_stats
+from mindscan.chat_context import ChatContext, context_stats
+from mindscan.image_prep import prepare_upload, upload_stats
+from mindscan.analysis_cache import AnalysisCache, analysis_key
+from mindscan.llm_gateway import LLMGateway, LLMUnavailable, request_key
+from mindscan.metrics import BYTES_BUCKETS, log_exception, metrics
+from mindscan.session_store import SessionBudget, session_registry
+from mindscan.shared_state import SessionArchive, SharedStore
+from mindscan.static_assets import ad_iframe_src, ad_srcdoc, theme_html
+from mindscan.prefetch import SessionTasks, prefetch_pool
+from mindscan.prompts import PROFILE_PROMPT_VERSION, persona_prompt, prediction_prompt, profile_prompt
+from mindscan.ai_manager import AIModelManager, MindScanConfig
+from mindscan.profile import AnalysisResult, Profile
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # [기존 코드]
 # if 'selected_scenario' not in st.session_state: st.session_state.selected_scenario = ""
@@ -32,138 +38,20 @@ import re
 # [▼ 아래 코드를 추가하세요]
 if 'show_share' not in st.session_state: st.session_state.show_share = False
 
-# ==========================================
-# [보조 함수] 그라데이션 이미지 생성
-# ==========================================
-def create_gradient_image(width, height, start_color, end_color):
-    """주어진 크기와 색상으로 그라데이션 이미지를 생성합니다."""
-    base = Image.new('RGB', (width, height), start_color)
-    top = Image.new('RGB', (width, height), end_color)
-    mask = Image.new('L', (width, height))
-    mask_data = []
-    for y in range(height):
-        mask_data.extend([int(255 * (y / height))] * width)
-    mask.putdata(mask_data)
-    return Image.composite(top, base, mask)
-
-# ==========================================
-# [핵심 클래스] 공유 및 이미지 관리
-# ==========================================
-class ShareManager:
-    def create_result_image(self, title, target_name, text_content):
-        """결과 텍스트를 예쁜 그라데이션 카드 이미지로 변환합니다."""
-        # 1. 디자인 및 크기 설정
-        width, height = 900, 1400   # 고해상도 이미지 크기
-        card_margin = 60            # 테두리 여백
-        card_radius = 40            # 카드 모서리 둥글기
-        content_margin = 50         # 카드 내부 텍스트 여백
-        
-        # 색상 팔레트 (앱 테마 통일)
-        start_color = "#667eea"      # 연보라 (시작)
-        end_color = "#764ba2"        # 진보라 (끝)
-        card_bg_color = (255, 255, 255, 235) # 반투명 흰색 카드
-        text_color_point = "#764ba2" # 포인트 컬러 (제목 등)
-        text_color_main = "#333333"  # 본문 컬러
-        text_color_sub = "#666666"   # 부가 정보 컬러
-        line_color = "#eeeeee"       # 구분선
-
-        # 2. 폰트 로드 (⚠️중요: 서버에 맞는 한글 폰트 경로 필수)
-        # 예: "NanumGothicBold.ttf", "/usr/share/fonts/truetype/nanum/NanumGothic.ttf"
-        font_path_bold = "malgunbd.ttf" # 윈도우용 맑은 고딕 볼드 (임시)
-        font_path_reg = "malgun.ttf"    # 윈도우용 맑은 고딕 일반 (임시)
-        
-        try:
-            font_h1 = ImageFont.truetype(font_path_bold, 70) # 대제목
-            font_h2 = ImageFont.truetype(font_path_bold, 45) # 중제목/섹션명
-            font_body_b = ImageFont.truetype(font_path_bold, 32) # 본문 볼드
-            font_body = ImageFont.truetype(font_path_reg, 32)    # 본문 일반
-            font_footer = ImageFont.truetype(font_path_reg, 24)  # 푸터
-        except Exception as e:
-            print(f"폰트 로드 실패: {e}. 기본 폰트로 대체합니다.")
-            # 폰트 파일이 없으면 기본 폰트 사용 (한글 깨질 수 있음)
-            default_font = ImageFont.load_default()
-            font_h1 = font_h2 = font_body_b = font_body = font_footer = default_font
-
-        # 3. 배경 그리기 (그라데이션 + 반투명 카드)
-        img = create_gradient_image(width, height, start_color, end_color)
-        draw = ImageDraw.Draw(img, 'RGBA')
-        
-        card_box = [card_margin, card_margin, width - card_margin, height - card_margin]
-        draw.rounded_rectangle(card_box, radius=card_radius, fill=card_bg_color)
-
-        # 4. 텍스트 그리기 시작 위치
-        start_x = card_margin + content_margin
-        current_y = card_margin + content_margin + 20
-        usable_width = width - (start_x * 2) # 텍스트가 들어갈 실제 너비
-
-        # [상단 제목 및 정보]
-        draw.text((start_x, current_y), "🧠 마인드스캔 분석 결과", font=font_h1, fill=text_color_point)
-        current_y += 100
-        draw.text((start_x, current_y), f"분석 대상: {target_name} 님", font=font_h2, fill=text_color_main)
-        current_y += 70
-        
-        # 구분선
-        draw.line([(start_x, current_y), (width - start_x, current_y)], fill=line_color, width=3)
-        current_y += 50
-
-        # 5. 본문 내용 파싱 및 그리기
-        # 불필요한 HTML/마크다운 제거 및 줄바꿈 정리
-        clean_text = re.sub(r'<[^>]+>', '', text_content) # HTML 태그 제거
-        clean_text = clean_text.replace("**", "")        # 마크다운 별표 제거
-        clean_text = clean_text.replace("&nbsp;", " ").strip()
-        
-        # 빈 줄을 기준으로 문단 나누기
-        paragraphs = re.split(r'\n\s*\n', clean_text)
-        
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph or paragraph == "---": continue # 빈 문단이나 구분선 건너뛰기
-
-            # 섹션 제목 감지 (이모지로 시작하는 라인)
-            is_section_title = any(paragraph.startswith(emoji) for emoji in ["👾", "⚔️", "🩸", "✨", "🗣️", "💘", "🎯", "🔮", "🎲"])
-            
-            if is_section_title:
-                current_y += 40 # 섹션 앞 간격
-                # 섹션 제목은 한 줄로 처리 및 강조
-                draw.text((start_x, current_y), paragraph, font=font_h2, fill=text_color_point)
-                current_y += 60 # 섹션 제목 후 간격
-            else:
-                # 일반 본문은 자동 줄바꿈 (textwrap) 적용
-                # 한글 기준 약 38~40자가 적당 (폰트 크기에 따라 조절 필요)
-                wrap_width = 38 
-                wrapped_lines = textwrap.wrap(paragraph, width=wrap_width)
-                
-                for line in wrapped_lines:
-                    # 프로필 항목(난이도, 강점 등)은 볼드체로 강조
-                    if any(prefix in line for prefix in ["난이도:", "강점:", "약점:"]):
-                         curr_font = font_body_b
-                         curr_color = text_color_main
-                    else:
-                         curr_font = font_body
-                         curr_color = text_color_main
-                         
-                    draw.text((start_x, current_y), line, font=curr_font, fill=curr_color)
-                    current_y += 48 # 줄 간격 (폰트 크기의 약 1.5배)
-                
-                current_y += 30 # 문단 간격
-
-        # [푸터]
-        footer_text = "Mind Scan AI - https://mind-scan.ai.kr"
-        footer_y = height - card_margin - content_margin # 바닥에서 위치 계산
-        draw.text((start_x, footer_y), footer_text, font=font_footer, fill=text_color_sub)
-
-        # 6. 결과 반환
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        return buffered.getvalue()
-
-    
-
-# [중요] PIL의 ImageDraw, ImageFont 사용을 위한 import 추가 (코드 최상단에 추가 필요)
-from PIL import ImageDraw, ImageFont 
-
-# 인스턴스 생성
-share_manager = ShareManager()
+# 인스턴스 생성 (카드 캐시를 rerun/세션 사이에 공유하기 위해 프로세스당 하나, 공유창을 처음 열 때 생성)
+@st.cache_resource
+def get_share_manager():
+    # MINDSCAN_CARD_CACHE_DIR 를 지정하면 렌더링된 카드를 디스크에도 보관합니다.
+    # 렌더링은 MINDSCAN_RENDER_WORKERS 개의 워커 프로세스에서 처리합니다 (0이면 스크립트 스레드에서 직접).
+    from mindscan.card_cache import CardCache
+    from mindscan.render_pool import RenderPool
+    from mindscan.share_card import ShareManager
+    pool = RenderPool(max_pending=int(os.environ.get("MINDSCAN_RENDER_QUEUE", "16")))
+    pool.warmup()
+    manager = ShareManager(cache=CardCache.from_env(shared=get_shared_store()), pool=pool)
+    metrics.register_collector("card_cache", manager.cache.snapshot)
+    metrics.register_collector("render_pool", lambda: {**pool.stats, "pending": pool.pending})
+    return manager
 
 # ==========================================
 # [설정] 광고 ID
@@ -185,98 +73,430 @@ if 'step' not in st.session_state: st.session_state.step = 0
 if 'messages' not in st.session_state: st.session_state.messages = []
 if 'analysis_result' not in st.session_state: st.session_state.analysis_result = ""
 if 'context_image' not in st.session_state: st.session_state.context_image = None
-if 'scenarios' not in st.session_state: st.session_state.scenarios = {}
 if 'general_analysis' not in st.session_state: st.session_state.general_analysis = ""
-if 'selected_scenario' not in st.session_state: st.session_state.selected_scenario = ""
-
-class MindScanConfig:
-    def __init__(self):
-        self.SERVICE_URL = "https://mind-scan.ai.kr"
-        self.MODEL_PREFERENCES = ["gemini-2.5-flash"]
-        self.SAFETY_SETTINGS = [{"category": c, "threshold": "BLOCK_NONE"} for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"]]
-        
-    def get_qr_code(self, url: str) -> str:
-        qr = qrcode.QRCode(version=1, box_size=10, border=2)
-        qr.add_data(url)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="white", back_color="transparent")
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        return f"data:image/png;base64,{img_str}"
-
-class AIModelManager:
-    def __init__(self, config: MindScanConfig):
-        self.config = config
-        self.model = None
-        self._setup_model()
-    
-    @st.cache_resource
-    def _setup_model(_self):
-        try:
-            if "GOOGLE_API_KEY" in st.secrets:
-                genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-                return genai.GenerativeModel("gemini-2.5-flash", safety_settings=_self.config.SAFETY_SETTINGS), "gemini-1.5-flash"
-            return None, "No API Key"
-        except Exception as e: return None, str(e)
-    
-    def generate_response(self, prompt: str, image: Optional[Image.Image] = None, stream: bool = False):
-        if not self.model: self.model, _ = self._setup_model()
-        content = [prompt]
-        if image: content.append(image)
-        return self.model.generate_content(content, stream=True) if stream else self.model.generate_content(content).text
 
-class AnalysisResult:
-    def __init__(self): self.profile = {}
-    def parse_profile(self, raw_text: str) -> Dict: return {}
+# 이번 실행(rerun)의 단계와 시작 시각 (스크립트 끝에서 렌더링 시간 기록)
+run_step, run_started = st.session_state.step, time.perf_counter()
+metrics.incr("script_runs_total", scope="app", step=run_step)
+
+def warmup_card_assets(service_url: str):
+    """(백그라운드) 한글 폰트를 찾아 카드용 크기를 로드하고, 서비스 URL QR(앱용 흰색/카드용 보라색/공유창용)을 만들어 둡니다."""
+    from mindscan.fonts import font_registry
+    from mindscan.share_card import CARD_QR_OPTIONS
+    font_registry.warmup()
+    qr_service.warmup([service_url])
+    qr_service.warmup([service_url], **CARD_QR_OPTIONS)
+    qr_service.warmup([service_url], **SHARE_PANEL_QR_OPTIONS)
+    return font_registry.describe()
+
+# 공유창에 보여줄 QR (밝은 배경용)
+SHARE_PANEL_QR_OPTIONS = {"box_size": 6, "border": 2, "fill_color": "#333333", "back_color": "white"}
+
+@st.cache_resource
+def get_llm_gateway():
+    """모든 세션이 공유하는 LLM 게이트웨이 (동시 호출/속도 제한, 타임아웃, 재시도, 중복 요청 합치기).
+
+    MINDSCAN_LLM_CONCURRENCY / RATE / BURST / TIMEOUT / QUEUE_TIMEOUT / RETRIES 환경변수로 조절합니다.
+    """
+    return LLMGateway.from_env()
+
+@st.cache_resource
+def get_shared_store():
+    """레플리카(파드)들이 함께 쓰는 저장소 (MINDSCAN_SHARED_STORE 지정 시). 분석 캐시/카드/세션 스냅샷을 공유합니다."""
+    store = SharedStore.from_env()
+    if store is not None: metrics.register_collector("shared_store", store.snapshot)
+    return store
+
+@st.cache_resource
+def get_session_archive():
+    """세션 토큰(?s=...)으로 진행 중인 세션을 저장/복원 (공유 저장소가 없으면 None)."""
+    return SessionArchive.from_env(get_shared_store())
+
+def _is_active_session(session_id: str) -> bool:
+    return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
 
 class SessionManager:
-    def __init__(self): self._init_session()
+    # 세션당 메모리 예산. 넘치면 카드 PNG(프로세스 카드 캐시에서 다시 가져옴)부터 버리고 오래된 채팅을 정리합니다.
+    BUDGET = SessionBudget(
+        max_bytes=int(os.environ.get("MINDSCAN_SESSION_BUDGET_KB", "1024")) * 1024,
+        droppable=["share_card_future"], trim_key="messages", keep_items=10,
+    )
+
+    # 다른 레플리카에서 이어갈 수 있도록 공유 저장소에 남기는 값 (이미지/백그라운드 작업은 다시 만듦)
+    PERSISTED_KEYS = ["step", "target_name", "target_gender", "target_calendar", "target_relation",
+                      "analysis_result", "context_text", "general_analysis", "trimmed_messages"]
+
+    def __init__(self):
+        self._init_session()
+        if 'session_token' not in st.session_state: self.resume()
     def _init_session(self):
-        if 'analysis_data' not in st.session_state: st.session_state.analysis_data = AnalysisResult()
+        if 'trimmed_messages' not in st.session_state: st.session_state.trimmed_messages = 0
+        if 'tasks' not in st.session_state: st.session_state.tasks = SessionTasks() # 다음 단계 미리 준비용 백그라운드 작업
+    @staticmethod
+    def _digest(data: dict) -> str:
+        return hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    def snapshot(self) -> dict:
+        data = {key: st.session_state[key] for key in self.PERSISTED_KEYS if key in st.session_state}
+        if "target_birth" in st.session_state: data["target_birth"] = st.session_state.target_birth.isoformat()
+        data["messages"] = [m.to_dict() for m in st.session_state.messages]
+        return data
+    def resume(self):
+        """이 프로세스에서 처음 보는 세션이면, URL 의 세션 토큰으로 다른 레플리카가 저장한 진행 상태를 불러옵니다."""
+        token = st.query_params.get("s")
+        archive = get_session_archive()
+        data = archive.load(token) if token and archive is not None else None
+        st.session_state.session_token = token if data else None
+        if token and archive is not None: metrics.incr("session_resumes_total", result="hit" if data else "miss")
+        if not data: return
+        for key in self.PERSISTED_KEYS:
+            if key in data: st.session_state[key] = data[key]
+        if "target_birth" in data: st.session_state.target_birth = datetime.date.fromisoformat(data["target_birth"])
+        st.session_state.messages = [ChatMessage.from_dict(m) for m in data.get("messages", [])]
+        st.session_state.session_saved = self._digest(data)
+    def persist(self):
+        """진행 상태가 바뀌었으면 공유 저장소에 저장합니다 (1단계부터, 처음 저장할 때 URL 에 세션 토큰을 붙임)."""
+        archive = get_session_archive()
+        if archive is None or st.session_state.step == 0: return
+        data = self.snapshot()
+        digest = self._digest(data)
+        if digest == st.session_state.get("session_saved"): return
+        if not st.session_state.get("session_token"):
+            st.session_state.session_token = SessionArchive.new_token()
+        st.query_params["s"] = st.session_state.session_token
+        archive.save(st.session_state.session_token, data)
+        st.session_state.session_saved = digest
+    def enforce_budget(self):
+        """매 실행마다 세션 크기를 예산 안으로 맞추고 프로세스 집계(session_registry)에 보고합니다."""
+        result = self.BUDGET.enforce(st.session_state)
+        st.session_state.trimmed_messages += result["trimmed"]
+        ctx = get_script_run_ctx()
+        if ctx is not None: session_registry.update(ctx.session_id, result["bytes"])
+        session_registry.prune(_is_active_session)
     def reset(self):
+        archive = get_session_archive()
+        if archive is not None and st.session_state.get("session_token"): archive.discard(st.session_state.session_token)
+        if "s" in st.query_params: del st.query_params["s"]
         for key in list(st.session_state.keys()): del st.session_state[key]
         self._init_session()
         st.session_state.step = 0
+        st.session_state.session_token = None
 
 config = MindScanConfig()
-ai_manager = AIModelManager(config)
+
+@st.cache_resource
+def configure_models():
+    """서버 프로세스당 한 번 API 키를 등록합니다 (SDK import 는 모델을 처음 만들 때)."""
+    try: api_key = st.secrets["GOOGLE_API_KEY"] if "GOOGLE_API_KEY" in st.secrets else None
+    except Exception: api_key = None # secrets.toml 이 없는 환경 (가짜 모델 백엔드 등)
+    model_registry.configure(api_key)
+    return model_registry.ready
+
+@st.cache_resource
+def start_background_warmup(_config: MindScanConfig):
+    """프로세스당 한 번, 유저가 랜딩 페이지를 지나면 LLM SDK/모델 클라이언트와 카드 폰트/QR 을 백그라운드에서 준비합니다."""
+    return [prefetch_pool.submit(model_registry.warmup, _config.MODEL_PREFERENCES, _config.SAFETY_SETTINGS),
+            prefetch_pool.submit(warmup_card_assets, _config.SERVICE_URL)]
+
+configure_models()
+ai_manager = AIModelManager(config, get_llm_gateway())
 session_manager = SessionManager()
+session_manager.enforce_budget()
+
+# Step 4 채팅에서 원문 그대로 다시 보내는 최근 대화의 토큰 예산
+CHAT_TOKEN_BUDGET = int(os.environ.get("MINDSCAN_CHAT_TOKEN_BUDGET", "1200"))
+
+def prepare_chat_context(target_name: str, profile_text: str, prediction) -> Tuple[str, ChatContext]:
+    """(백그라운드) Step 3.5 예측이 끝난 뒤 Step 4 페르소나를 구성해 (예측 텍스트, ChatContext) 로 돌려줍니다 (prediction.text() 는 기다리지 않음)."""
+    general_analysis = prediction.text()
+    return general_analysis, ChatContext(persona_prompt(target_name, profile_text, general_analysis), token_budget=CHAT_TOKEN_BUDGET)
+
+@st.cache_resource
+def get_analysis_cache():
+    """세션 간 공유 분석 캐시 (메모리 LRU + MINDSCAN_ANALYSIS_CACHE_DB 지정 시 SQLite + 레플리카 공유 저장소)."""
+    return AnalysisCache.from_env(shared=get_shared_store())
+
+analysis_cache = get_analysis_cache()
+
+# 테마 CSS/광고는 static/ 에서 제공 (.streamlit/config.toml 의 server.enableStaticServing)
+SERVE_STATIC = bool(st.get_option("server.enableStaticServing"))
+
+def inject_theme(name: str):
+    """테마 CSS를 해시가 붙은 정적 파일 <link> 로 넣습니다. 브라우저는 내용이 바뀔 때만 다시 받습니다."""
+    st.markdown(theme_html(name, SERVE_STATIC), unsafe_allow_html=True)
+
+def render_ad(width: int, height: int, frame_height: int):
+    """광고 iframe. 정적 파일 URL이 매번 같아서 rerun 때 광고 스크립트를 다시 불러오지 않습니다."""
+    if SERVE_STATIC:
+        st.iframe(ad_iframe_src(ADSENSE_CLIENT_ID, ADSENSE_SLOT_ID, width, height, st.get_option("server.baseUrlPath")), height=frame_height)
+    else:
+        st.iframe(ad_srcdoc(ADSENSE_CLIENT_ID, ADSENSE_SLOT_ID, width, height), height=frame_height)
+
+def format_result_html(text: str, strong_style: str = "") -> str:
+    """LLM 마크다운(**굵게**, 줄바꿈)을 결과 카드용 HTML로 바꿉니다."""
+    open_tag = f'<strong style="{strong_style}">' if strong_style else "<strong>"
+    formatted = re.sub(r'\*\*(.*?)\*\*', lambda m: f"{open_tag}{m.group(1)}</strong>", text)
+    return formatted.replace("\n", "<br>")
+
+def current_profile() -> Profile:
+    """이 세션의 Step 2 결과를 구조화한 프로필 (같은 원문은 프로세스에서 한 번만 파싱)."""
+    return AnalysisResult.parse_profile(st.session_state.analysis_result)
+
+def format_profile_html(profile: Profile) -> str:
+    """프로필을 결과 카드용 HTML로 (항목 라벨은 굵게, 구역 사이는 한 줄 띄움). 파싱된 내용이 없으면 ""."""
+    parts = ["<br>".join(f"<strong>{label}</strong>: {value}" for label, value in profile.field_lines())]
+    for section in profile.sections:
+        title = f"<strong>{section.title}</strong><br>" if section.title else ""
+        parts.append(title + section.body.replace("\n", "<br>"))
+    return "<br><br>".join(part for part in parts if part)
+
+def stream_into(placeholder, chunks: Iterator[str], render, waiting_text: str) -> str:
+    """스트리밍 조각을 받는 대로 placeholder 에 다시 그리고, 완성된 전체 텍스트를 돌려줍니다."""
+    chunks = iter(chunks)
+    with placeholder, st.spinner(waiting_text): # 첫 조각이 올 때까지만 스피너 표시 (placeholder 자리 안에서)
+        full_text = next(chunks, "")
+    placeholder.markdown(render(full_text), unsafe_allow_html=True)
+    for chunk in chunks:
+        full_text += chunk
+        placeholder.markdown(render(full_text), unsafe_allow_html=True)
+    return full_text
+
+@st.cache_resource
+def register_metric_collectors():
+    """각 모듈의 누적 통계를 지표 페이지/Prometheus 게이지로 함께 내보냅니다."""
+    metrics.register_collector("analysis_cache", analysis_cache.snapshot)
+    metrics.register_collector("llm_gateway", ai_manager.gateway.snapshot)
+    metrics.register_collector("chat_decoder", decoder_stats.snapshot)
+    metrics.register_collector("chat_context", context_stats.snapshot)
+    metrics.register_collector("upload", upload_stats.snapshot)
+    metrics.register_collector("qr", lambda: dict(qr_service.stats))
+    metrics.register_collector("sessions", session_registry.snapshot)
+    metrics.register_collector("prefetch", prefetch_pool.snapshot)
+    return True
+
+register_metric_collectors()
+
+# ==========================================
+# [관리자] 숨김 지표 페이지 (?metrics=<MINDSCAN_METRICS_TOKEN>, 토큰을 설정하지 않으면 열리지 않음)
+# ==========================================
+METRICS_TOKEN = os.environ.get("MINDSCAN_METRICS_TOKEN", "")
+
+def render_metrics_page():
+    st.markdown("### 📈 MindScan 지표")
+    snapshot = metrics.snapshot()
+    st.caption(f"uptime {snapshot['uptime_seconds']}s")
+    rows = [{"metric": name, **{k: v for k, v in row.items() if k != "labels"}, **row["labels"]}
+            for name, series in snapshot["histograms"].items() for row in series]
+    st.markdown("##### 단계별 분포 (p50/p95 는 버킷 상한)")
+    st.dataframe(rows, width="stretch")
+    st.markdown("##### 카운터")
+    st.json(snapshot["counters"], expanded=False)
+    st.markdown("##### 모듈 통계")
+    st.json(snapshot["gauges"], expanded=False)
+    prometheus_text = metrics.prometheus_text()
+    st.download_button("Prometheus 텍스트 내려받기", prometheus_text, file_name="metrics.prom", mime="text/plain")
+    st.code(prometheus_text, language=None)
+
+if METRICS_TOKEN and secrets.compare_digest(st.query_params.get("metrics", "").encode("utf-8"), METRICS_TOKEN.encode("utf-8")):
+    render_metrics_page()
+    st.stop()
+
+# ==========================================
+# [4단계] 대화방 / 공유 패널 (조각(fragment) 단위 rerun)
+# ==========================================
+# 대화방 조각이 다시 그리는 최근 메시지 수의 상한. 넘으면 전체 실행 한 번으로 이전 대화 쪽에 합칩니다.
+CHAT_TAIL_MESSAGES = int(os.environ.get("MINDSCAN_CHAT_TAIL_MESSAGES", "10"))
+
+def render_chat_message(m: ChatMessage):
+    # 메시지는 도착할 때 한 번 파싱되고 HTML 조각도 미리 만들어져 있으므로 그대로 출력만 함
+    if m.role == "user":
+        st.markdown(m.html, unsafe_allow_html=True)
+        return
+    col_profile, col_bubble = st.columns([1, 7])
+    with col_profile:
+        st.markdown(m.profile_html, unsafe_allow_html=True)
+    with col_bubble:
+        st.markdown(m.html, unsafe_allow_html=True)
+        
+        # 속마음 보기 (Expander) - 말풍선 바로 아래 위치, 기본적으로 닫혀있음
+        with st.expander("🔍 속마음 & 공략팁 (Click)"):
+            st.markdown(m.detail_md)
+
+def is_fragment_rerun() -> bool:
+    """전체 app.py 가 아니라 조각만 다시 실행 중인지 (스크립트 실행 횟수 집계용)."""
+    ctx = get_script_run_ctx()
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+def add_chat_message(m: ChatMessage):
+    st.session_state.messages.append(m)
+    st.session_state.chat_tail.append(m) # 마지막 전체 실행 이후의 메시지 (대화방 조각이 그림)
+
+def submit_chat_input():
+    """chat_input 콜백: 조각이 다시 실행되기 전에 유저 메시지를 기록해, 같은 실행에서 바로 답장을 만듭니다."""
+    if st.session_state.chat_draft: add_chat_message(ChatMessage.from_user(st.session_state.chat_draft))
+
+@st.fragment(key="chat_room")
+def chat_room():
+    """메시지를 보내면 전체 app.py 대신 이 조각만 한 번 다시 실행됩니다 (유저 메시지 표시 → 답장 생성 → 표시)."""
+    if is_fragment_rerun(): metrics.incr("script_runs_total", scope="chat_room", step=4)
+    started = time.perf_counter()
+    if not st.session_state.messages:
+        st.info(f"'{st.session_state.target_name}'님에게 보낼 첫 메시지를 입력해보세요.")
+    for m in st.session_state.chat_tail:
+        render_chat_message(m)
+
+    # AI 답변 생성 로직 (마지막 메시지가 아직 답장을 받지 못한 유저 메시지인 경우)
+    if st.session_state.messages and st.session_state.messages[-1].role == "user":
+        # 답장을 스트리밍으로 받으면서 reply 필드가 완성되는 즉시 말풍선에 먼저 보여줌
+        reply_box = st.empty()
+        try:
+            # 페르소나/상황/출력 형식은 대화 기록의 고정된 첫 턴으로 한 번만 구성하고,
+            # 매 턴에는 최근 대화 창 + 오래된 대화 요약 + 새 메시지만 보냄
+            # Step 3 에서 미리 만들어 둔 페르소나가 지금 화면의 예측과 같으면 그대로 사용
+            prepared = st.session_state.tasks.result("persona", st.session_state.get("prefetch_key"))
+            if prepared and prepared[0] == st.session_state.general_analysis:
+                chat_context = prepared[1]
+            else:
+                chat_context = ChatContext(persona_prompt(st.session_state.target_name, current_profile().to_prompt(),
+                                                          st.session_state.general_analysis), token_budget=CHAT_TOKEN_BUDGET)
+            chat_prompt = chat_context.build(st.session_state.messages)
+            reply_box.markdown(bot_bubble_html(f"{st.session_state.target_name}님이 입력 중..."), unsafe_allow_html=True)
+            reply_stream = JSONFieldStream()
+            for chunk in ai_manager.stream_chat(chat_prompt.history, chat_prompt.message, CHAT_GENERATION_CONFIG):
+                if "reply" in reply_stream.feed(chunk):
+                    reply_box.markdown(bot_bubble_html(reply_stream.fields["reply"]), unsafe_allow_html=True)
+            response_text = reply_stream.buffer
+            # 답변은 여기서 한 번만 해석하고 그 결과로 메시지를 만듦 (decoder_stats 는 답변당 한 번 집계)
+            decoded = decode_chat_reply(response_text)
+            if decoded is None:
+                # 구조화 출력 + 관대한 파서로도 복구하지 못한 경우에만 한 번 다시 요청
+                decoder_stats.incr("retries")
+                response_text = "".join(ai_manager.stream_chat(chat_prompt.history, chat_prompt.message, CHAT_GENERATION_CONFIG, fresh=True))
+                decoded = decode_chat_reply(response_text)
+            # 턴당 입력 토큰 기록 (Gemini usage_metadata 우선, 없으면 추정값)
+            turn_tokens = ai_manager.last_prompt_tokens or chat_prompt.estimated_tokens
+            context_stats.record(turn_tokens)
+            st.session_state.setdefault("chat_input_tokens", []).append(turn_tokens)
+            reply = ChatMessage.from_reply(response_text, decoded)
+            add_chat_message(reply)
+            # rerun 없이 스트리밍하던 자리를 완성된 말풍선(+속마음)으로 교체
+            with reply_box.container():
+                render_chat_message(reply)
+            session_manager.enforce_budget()
+            session_manager.persist()
+        except LLMUnavailable as e: # 혼잡/시간 초과는 오류 로그 대신 안내 문구만
+            reply_box.warning(f"⏳ {e}")
+        except Exception:
+            error_id = log_exception("chat_turn_failed", step="4", turn=len(st.session_state.messages))
+            reply_box.error(f"🚫 답장을 받지 못했어요. 다시 보내주세요. (오류 ID: {error_id})")
+
+    # 하단 여백 확보 (입력창에 가려지지 않게)
+    st.write("<br>" * 3, unsafe_allow_html=True)
+    # 입력창 (CSS로 하단에 고정하고 흰 창 내부에 있는 것처럼 보이게 디자인함)
+    st.chat_input("메시지 입력...", key="chat_draft", on_submit=submit_chat_input)
+    metrics.observe("fragment_run_seconds", time.perf_counter() - started, fragment="chat_room")
+    if len(st.session_state.chat_tail) >= CHAT_TAIL_MESSAGES and is_fragment_rerun():
+        st.rerun() # 조각이 다시 그리는 양이 대화 길이에 비례해 늘지 않도록 가끔 한 번 전체 실행
+
+
+def observe_card_sizes(future):
+    """카드 변형별 인코딩 크기 기록 (형식/품질 설정 비교용)."""
+    if future.cancelled() or future.exception() is not None: return
+    for image in future.result().values():
+        metrics.observe("share_card_bytes", image.size, buckets=BYTES_BUCKETS, variant=image.name, format=image.extension)
+
+
+@st.fragment(key="share_panel")
+def share_panel():
+    """처음으로/공유하기 버튼과 공유창. 공유창을 열고 닫을 때는 이 조각만 다시 실행됩니다."""
+    if is_fragment_rerun(): metrics.incr("script_runs_total", scope="share_panel", step=4)
+    # 버튼 2개 나란히 배치 (왼쪽: 처음으로 / 오른쪽: 공유하기)
+    c1, c2 = st.columns(2)
+    
+    with c1:
+        # 처음으로 버튼 (전체 화면이 바뀌므로 앱 전체 rerun)
+        if st.button("🔄 처음부터 다시하기", width="stretch", key="btn_restart_final"):
+            session_manager.reset()
+            st.rerun()
+            
+    with c2:
+        # 누르면 아래에 공유창(URL 복사 등)이 열렸다 닫혔다 함 (버튼 클릭으로 이미 이 조각이 다시 실행 중)
+        if st.button("🔗 공유하기", width="stretch", key="btn_toggle_share"):
+            st.session_state.show_share = not st.session_state.show_share
+
+    # 공유하기 스위치가 켜져있으면 UI 보여주기
+    if not st.session_state.show_share: return
+    st.markdown("""
+        <div style="background-color:#f8f9fa; padding:20px; border-radius:15px; margin-top:15px; border:1px solid #eee;">
+        """, unsafe_allow_html=True)
+    
+    # 제목 변경: 결과 공유하기 -> 공유하기
+    st.markdown("<h5 style='text-align:center; color:#333; margin-bottom:15px;'>🔗 공유하기</h5>", unsafe_allow_html=True)
+    
+    # 1. URL 복사 기능 (가장 중요)
+    share_url = config.SERVICE_URL
+    st.code(share_url, language=None) # 사용자가 꾹 눌러서 복사하기 편하게 코드 블록으로 제공
+    st.caption("👆 위 링크를 복사해서 친구에게 보내보세요!")
+
+    # QR 코드 (캐시된 PNG 바이트를 그대로 사용)
+    _, qr_col, _ = st.columns([3, 2, 3])
+    with qr_col:
+        st.image(qr_service.png(share_url, **SHARE_PANEL_QR_OPTIONS), width="stretch")
+    
+    st.write("---")
+
+    # 2. 결과 카드 이미지 (워커 프로세스에서 렌더링, 완성 전까지는 자리표시자 표시)
+    from mindscan.share_card import RESULT_CARD_TITLE
+    share_manager = get_share_manager()
+    card_args = (RESULT_CARD_TITLE, st.session_state.target_name, current_profile())
+    # 예산 초과로 세션에서 버려진 카드는 프로세스 카드 캐시에서 다시 가져옵니다.
+    if st.session_state.get("share_card_args") != card_args or st.session_state.get("share_card_future") is None:
+        try:
+            card_started = time.perf_counter()
+            future = share_manager.submit_result_image(*card_args)
+            metrics.incr("cache_requests_total", cache="share_card", result="hit" if future.done() else "miss")
+            future.add_done_callback(lambda f: metrics.observe("share_card_seconds", time.perf_counter() - card_started, step="share"))
+            future.add_done_callback(observe_card_sizes)
+            st.session_state.share_card_future = future
+            st.session_state.share_card_args = card_args
+        except RenderQueueFull:
+            st.warning("지금 카드 요청이 많아요. 잠시 후 다시 시도해주세요.")
+        except BrokenProcessPool:
+            # 새 풀로 재시도해도 워커가 바로 죽은 경우: 앱은 계속 쓰고 카드만 건너뜀
+            log_exception("share_card_failed", step="share")
+            st.warning("결과 카드 이미지를 만들지 못했어요.")
+
+    share_card_future = st.session_state.get("share_card_future")
+    if share_card_future is None or st.session_state.get("share_card_args") != card_args: return
+    card_pending = not share_card_future.done()
+
+    # 렌더링 중에는 1초마다 이 영역만 다시 그려서 완성 여부를 확인합니다.
+    @st.fragment(run_every=1.0 if card_pending else None)
+    def share_card_view():
+        future = st.session_state.share_card_future
+        if not future.done():
+            st.info("🖼️ 결과 카드 이미지를 만드는 중...")
+            return
+        if card_pending:
+            st.rerun() # 완성되면 한 번만 전체 rerun 해서 폴링을 멈춤 (카드를 새로 렌더링한 경우에만)
+        if future.exception() is not None:
+            st.warning("결과 카드 이미지를 만들지 못했어요.")
+            return
+        # 화면에는 가벼운 미리보기, 저장 버튼에는 원본 크기 이미지
+        images = future.result()
+        full, thumb = images["full"], images.get("thumb", images["full"])
+        st.image(thumb.data, width="stretch")
+        st.download_button("📥 결과 카드 저장하기", full.data, file_name=f"mindscan_result.{full.extension}",
+                           mime=full.mime_type, width="stretch")
+        st.caption(" · ".join(f"{image.name} {image.extension.upper()} {image.width}px {image.size / 1024:.0f}KB" for image in images.values()))
+
+    share_card_view()
 
 # ==========================================
 # [0단계] 랜딩 페이지
 # ==========================================
 if st.session_state.step == 0:
+    inject_theme("css/landing.css")
     st.markdown("""
-        <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+KR:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
-        <style>
-            .stApp { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); font-family: 'Noto Sans KR', sans-serif; }
-            .block-container { max-width: 100% !important; padding: 0 !important; }
-            header {visibility: hidden;}
-            
-            /* [수정 핵심] min-height를 100vh에서 80vh로 줄여서 버튼이 들어올 공간 확보 */
-            .hero-section { 
-                min-height: 80vh; 
-                display: flex; 
-                flex-direction: column; 
-                justify-content: center; /* 내용을 아래쪽으로 정렬하여 버튼과 가깝게 */
-                align-items: center; 
-                text-align: center; 
-                padding: 20px; 
-                color: white; 
-            }
-            
-            .hero-title { font-size: 3rem; font-weight: 900; margin-bottom: 10px; text-shadow: 0 4px 10px rgba(0,0,0,0.2); }
-            
-            /* 버튼 스타일 */
-            div.stButton > button {
-                background: white !important; color: #764ba2 !important; font-size: 1.2rem !important; font-weight: 700 !important;
-                padding: 1rem 3rem !important; border-radius: 50px !important; border: none !important;
-                box-shadow: 0 10px 25px rgba(0,0,0,0.2) !important; transition: all 0.3s ease !important;
-            }
-            div.stButton > button:hover { transform: translateY(-5px) !important; background-color: #f8f9fa !important; }
-        </style>
-        
         <div class="hero-section">
             <div style="font-size: 4rem; margin-bottom: 10px;">🧠</div>
             <h1 class="hero-title">AI가 분석하는<br>관계의 속마음</h1>
@@ -288,7 +508,7 @@ if st.session_state.step == 0:
     
     _, col, _ = st.columns([4, 2, 4]) 
     with col:
-        if st.button("✨ 무료로 분석 시작하기", use_container_width=True):
+        if st.button("✨ 무료로 분석 시작하기", width="stretch"):
             st.session_state.step = 1
             st.rerun()
             
@@ -298,82 +518,8 @@ if st.session_state.step == 0:
 # [1단계 ~ 4단계] 메인 앱
 # ==========================================
 else:
-    st.markdown("""
-    <style>
-        /* [1. 전체 배경 및 스크롤 설정] */
-        .stApp { 
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            font-family: 'Noto Sans KR', sans-serif; 
-            overflow-y: auto !important; /* 세로 스크롤 허용 */
-        }
-        
-        /* [2. 메인 컨테이너 (Streamlit 내부 래퍼) 강제 확장] */
-        div[data-testid="stAppViewContainer"] {
-            height: auto !important;
-            overflow: visible !important;
-        }
-        div[data-testid="stAppViewContainer"] > section {
-            height: fit-content !important;
-            overflow: visible !important;
-        }
-
-        /* [3. 하얀색 폰 화면 (껍데기)] - 여기가 핵심입니다 */
-        .block-container {
-            max-width: 600px !important;
-            margin: 40px auto !important;
-            
-            height: auto !important;
-            min-height: 800px !important;
-            flex: none !important; 
-            display: block !important;
-            
-            /* 디자인 */
-            background-color: #ffffff !important;
-            border-radius: 35px !important;
-            padding: 40px 20px 40px 20px !important;
-            box-shadow: 0 30px 60px rgba(0,0,0,0.4) !important;
-            overflow: visible !important;
-        }
-
-        /* [4. 내부 콘텐츠 덩어리] - 얘도 같이 늘어나야 함 */
-        div[data-testid="stVerticalBlock"] {
-            height: fit-content !important;
-            display: block !important;
-            overflow: visible !important;
-        }
-        
-        /* [5. 기타 스타일 (기존 유지)] */
-        .phone-footer {
-            margin-top: 20px;
-            width: 100%;
-            background: #ffffff;
-            padding: 15px 20px;
-            border-top: 1px solid #eee;
-            border-bottom-left-radius: 35px;
-            border-bottom-right-radius: 35px;
-        }
-
-        .stButton > button {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-            color: white !important; border-radius: 12px !important; 
-            padding: 12px 0 !important; font-weight: bold !important; border: none !important;
-        }
-        
-        .chat-row { display: flex; width: 100%; margin-bottom: 15px; }
-        .chat-row-user { justify-content: flex-end; }
-        .chat-row-bot { justify-content: flex-start; }
-        .chat-bubble { max-width: 80%; padding: 12px 16px; font-size: 0.95rem; line-height: 1.5; border-radius: 15px; box-shadow: 0 1px 2px rgba(0,0,0,0.1); }
-        .user-bubble { background: #667eea; color: white; border-radius: 18px 18px 0 18px; }
-        .bot-bubble { background: #ffffff; color: #333; border-radius: 18px 18px 18px 0; border: 1px solid #e9ecef; }
-        .chat-profile { width: 38px; height: 38px; border-radius: 50%; background: #eee; display: flex; justify-content: center; align-items: center; margin-right: 10px; font-size: 22px; flex-shrink: 0; }
-        .info-card { background: white; border-radius: 15px; padding: 20px; margin: 15px 0; border: 1px solid #eee; line-height: 1.7; }
-        .scenario-result-box { background: #f8f9fa; border-left: 5px solid #667eea; padding: 20px; border-radius: 5px; margin-bottom: 20px; }
-        
-        .phone-header { text-align: center; padding-bottom: 10px; }
-        .stChatInput { position: fixed !important; bottom: 20px !important; left: 50% !important; transform: translateX(-50%) !important; width: 100% !important; max-width: 580px !important; z-index: 1000 !important; }
-        .stChatInput > div { border-radius: 25px !important; border: 1px solid #ccc !important; background: white !important; box-shadow: 0 4px 10px rgba(0,0,0,0.1) !important; }
-    </style>
-    """, unsafe_allow_html=True)
+    start_background_warmup(config)
+    inject_theme("css/app.css")
 
     st.markdown('<h3 style="text-align:center; margin:0;">🧠 마인드스캔</h3>', unsafe_allow_html=True)
     curr = {1:25, 2:50, 3:75, 3.5:85, 4:100}.get(st.session_state.step, 0)
@@ -402,48 +548,48 @@ else:
     # ---------------- Step 2 성향 분석 ----------------
     elif st.session_state.step == 2:
         st.markdown(f"##### 2. {st.session_state.target_name}님 성향 분석")
+        # 스트리밍 자리는 매 실행 같은 위치에 두어, 아래 광고 iframe 의 위치(=다시 로드 여부)가 바뀌지 않게 함
+        stream_box = st.empty()
         
         if not st.session_state.analysis_result:
-            with st.spinner("대상 데이터 분석 중..."):
-                try:
-                    p = f"""
-                    역할: 당신은 최고의 심리 분석가입니다. 대상의 생일 데이터를 기반으로 사주, 점성학 데이터를 심도있게 해석합니다.
-                    대상: {st.session_state.target_name}({st.session_state.target_gender}, {st.session_state.target_birth})의 심리 성향을 분석해주세요.
-                    
-                    [지시사항]
-                    1. 전문 용어(사주, 점성학)는 절대 사용하지 말고, 쉬운 심리학 표현을 쓰세요.
-                    2. **난이도, 강점, 약점**은 반드시 **각각 한 줄씩** 작성하세요.
-                    3. 강점과 약점의 키워드는 문장이 아니라 **단어로 나열**하고 앞에 **#**을 붙이세요.
-                    4. 불필요한 서론이나 기호(-, *)를 쓰지 말고 아래 **[출력 예시]** 와 똑같은 구조로 출력하세요.
-                    5. 난이도는 [최상/상/중/하/최하] 중에 적합한 것으로 골라 작성하세요.
-                    
-                    [출력 예시 - 이 구조를 그대로 따르세요]
-
-                    **[Profile]**
-                    **👾 난이도**: [중] 겉은 차갑지만 속은 따뜻한 반전 매력 
-                    **⚔️ 강점**: #통찰력 #공감능력 #창의성 
-                    **🩸 약점**: #내향성 #감정 기복 #예민함 
-                    <br>
-                    **✨ 타고난 성향**
-                    (내용)
-                    **🗣️ 대화 스타일**
-                    (내용)
-                    **💘 공략 포인트**
-                    (내용)
-                    """
-                    st.session_state.analysis_result = ai_manager.generate_response(p)
-                except Exception as e:
-                    st.error(f"🚫 시스템 오류 발생: {e}")
-                    st.code(traceback.format_exc()) # 상세 에러 로그 출력 (어디서 틀렸는지 줄번호까지 나옴)
+            try:
+                p = profile_prompt(st.session_state.target_gender, st.session_state.target_birth)
+                # 같은 성별/생년월일/모델 조합은 다른 세션의 분석 결과를 그대로 재사용
+                cache_key = analysis_key(
+                    config.MODEL_PREFERENCES[0], PROFILE_PROMPT_VERSION,
+                    gender=st.session_state.target_gender, birth=st.session_state.target_birth,
+                )
+                cached = analysis_cache.get(cache_key, st.session_state.target_name)
+                metrics.incr("cache_requests_total", cache="analysis", result="hit" if cached else "miss")
+                if cached:
+                    st.session_state.analysis_result = cached
+                else:
+                    # 생성되는 대로 바로 보여주고, 완료되면 아래의 최종 카드로 교체
+                    # (캐시에는 모델이 쓴 NAME_TOKEN 그대로 저장하고, 이름은 화면/세션에만 채움)
+                    name = st.session_state.target_name
+                    st.session_state.analysis_result = AnalysisCache.restore_name(stream_into(
+                        stream_box,
+                        analysis_cache.record_stream(cache_key, ai_manager.stream_response(p, step="2")),
+                        lambda text: f'<div class="info-card">{format_result_html(AnalysisCache.restore_name(text, name))}</div>',
+                        "대상 데이터 분석 중...",
+                    ), name)
+                    stream_box.empty()
+            except LLMUnavailable as e: # 혼잡/시간 초과는 오류 로그 대신 안내 문구만
+                st.warning(f"⏳ {e}")
+            except Exception:
+                # 트레이스백은 서버 로그(JSON)로만 남기고, 사용자에게는 문의용 오류 ID만 보여줌
+                error_id = log_exception("profile_analysis_failed", step="2")
+                st.error(f"🚫 분석 중 오류가 발생했어요. 잠시 후 다시 시도해주세요. (오류 ID: {error_id})")
 
 
         if st.session_state.analysis_result:
-            formatted_text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', st.session_state.analysis_result)
-            formatted_text = formatted_text.replace("\n", "<br>")
+            # 유저가 결과를 읽는 동안 다음 단계에서 쓸 모델 클라이언트를 백그라운드에서 준비
+            st.session_state.tasks.submit("warmup", model_registry.backend, model_registry.warmup, config.MODEL_PREFERENCES, config.SAFETY_SETTINGS)
+            formatted_text = format_profile_html(current_profile()) or format_result_html(st.session_state.analysis_result)
             st.markdown(f'<div class="info-card">{formatted_text}</div>', unsafe_allow_html=True)
             
             # 광고 A
-            components.html(f"""<div style="display:flex;justify-content:center;"><script async src="https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js?client={ADSENSE_CLIENT_ID}" crossorigin="anonymous"></script><ins class="adsbygoogle" style="display:inline-block;width:300px;height:250px" data-ad-client="{ADSENSE_CLIENT_ID}" data-ad-slot="{ADSENSE_SLOT_ID}"></ins><script>(adsbygoogle = window.adsbygoogle || []).push({{}});</script></div>""", height=260)
+            render_ad(300, 250, frame_height=260)
             
             # 버튼 위치 (하단 배치)
             st.write("")
@@ -453,49 +599,62 @@ else:
     elif st.session_state.step == 3:
         st.markdown("##### 3. 상황 데이터 입력")
         img = st.file_uploader("카톡 캡처 (선택)", type=['png','jpg','jpeg'])
-        if img: st.session_state.context_image = Image.open(img); st.image(img, use_container_width=True)
+        if img:
+            # 업로드 원본 대신 축소/압축한 바이트만 세션에 보관 (같은 파일은 rerun 때 다시 처리하지 않음)
+            if st.session_state.get("context_image_id") != img.file_id or st.session_state.context_image is None:
+                with metrics.timer("upload_prep_seconds", step="3"):
+                    st.session_state.context_image = prepare_upload(img.getvalue())
+                metrics.observe("upload_bytes", st.session_state.context_image.original_bytes, buckets=BYTES_BUCKETS, stage="original")
+                metrics.observe("upload_bytes", len(st.session_state.context_image.data), buckets=BYTES_BUCKETS, stage="prepared")
+                st.session_state.context_image_id = img.file_id
+            prepared = st.session_state.context_image
+            st.image(prepared.data, width="stretch")
+            st.caption(f"📦 {prepared.original_bytes / 1024:.0f}KB → {len(prepared.data) / 1024:.0f}KB ({prepared.width}x{prepared.height})")
         txt = st.text_area("상황 설명", height=120, placeholder="예: 어제 싸우고 연락이 없는데 무슨 심리일까?")
         
         if st.button("진단 시작 🩺"):
-            if txt: st.session_state.context_text = txt; st.session_state.step = 3.5; st.rerun()
+            if txt:
+                st.session_state.context_text = txt
+                st.session_state.general_analysis = ""
+                # rerun 을 기다리지 않고 Step 3.5 예측 호출을 바로 시작하고(다음 화면은 같은 호출에 합쳐짐),
+                # 예측이 끝나면(게이트웨이 완료 콜백) Step 4 페르소나도 백그라운드에서 구성해 둠
+                # (예측을 기다리는 동안 공유 prefetch 스레드를 잡고 있지 않음)
+                if not img: st.session_state.context_image = None # 업로드를 지웠으면 이전 캡처도 보내지 않음
+                image = st.session_state.context_image
+                profile_text = current_profile().to_prompt()
+                prediction = ai_manager.prefetch(prediction_prompt(profile_text, txt), image)
+                st.session_state.prefetch_key = request_key(st.session_state.target_name, st.session_state.analysis_result, txt, image.data if image else b"")
+                st.session_state.tasks.submit_after("persona", st.session_state.prefetch_key, prediction, prepare_chat_context,
+                                                    st.session_state.target_name, profile_text, prediction)
+                st.session_state.step = 3.5
+                st.rerun()
 
     # ---------------- Step 3.5 AI 행동 예측 ----------------
     elif st.session_state.step == 3.5:
         st.markdown("##### 🕵️‍♂️ AI 정밀 행동 예측")
+        stream_box = st.empty()
         
         if not st.session_state.general_analysis:
-            with st.spinner("최적의 시나리오 및 변수 예측 중..."):
-                # 여러 시나리오 선택 없이, AI가 최적의 시나리오 1개를 자동 도출
-                p = f"""
-                대상:{st.session_state.analysis_result}
-                상황:{st.session_state.context_text}
-                
-                [미션]
-                1. 현재 상황에서 가장 가능성이 높은 **단 하나의 시나리오**를 도출하세요.
-                2. 상대의 심리 데이터를 기반으로 이 상황에서 발생할 수 있는 주요 변수(상대의 기분 변화, 외부 요인 등)를 예측하세요.
-                3. 전문 용어 없이 친절한 심리 상담가처럼 설명하세요.
-                
-                [출력 형식]
-                **🎯 핵심 분석 (승률 00%)**
-                (가장 유력한 상황 분석 내용 - 3문장 이내)
-                
-                **🔮 미래 예측**
-                (당신이 이렇게 행동했을 때 벌어질 일 예측)
-                
-                **🎲 주요 변수**
-                (주의해야 할 돌발 변수 1가지)
-                """
-                res = ai_manager.generate_response(p, st.session_state.context_image)
+            # 여러 시나리오 선택 없이, AI가 최적의 시나리오 1개를 자동 도출
+            try:
+                p = prediction_prompt(current_profile().to_prompt(), st.session_state.context_text)
+                res = stream_into(
+                    stream_box, ai_manager.stream_response(p, st.session_state.context_image, step="3.5"),
+                    lambda text: f'<div class="scenario-result-box">{format_result_html(text, "font-weight: 900;")}</div>',
+                    "최적의 시나리오 및 변수 예측 중...",
+                )
                 st.session_state.general_analysis = res
-                st.session_state.selected_scenario = res
+                st.session_state.context_image = None # 예측이 끝나면 캡처 이미지는 더 쓰지 않으므로 세션에서 해제
+            except LLMUnavailable as e:
+                st.warning(f"⏳ {e}")
+            except Exception:
+                # 트레이스백은 서버 로그(JSON)로만 남기고, 사용자에게는 문의용 오류 ID만 보여줌
+                error_id = log_exception("prediction_failed", step="3.5")
+                st.error(f"🚫 예측 중 오류가 발생했어요. 잠시 후 다시 시도해주세요. (오류 ID: {error_id})")
+            stream_box.empty()
 
         if st.session_state.general_analysis:
-            formatted_analysis = re.sub(
-                r'\*\*(.*?)\*\*', 
-                r'<strong style="font-weight: 900;">\1</strong>', 
-                st.session_state.general_analysis
-            )
-            formatted_analysis = formatted_analysis.replace("\n", "<br>")
+            formatted_analysis = format_result_html(st.session_state.general_analysis, "font-weight: 900;")
             st.markdown(f"""
             <div class="scenario-result-box">
                 {formatted_analysis}
@@ -503,13 +662,13 @@ else:
             """, unsafe_allow_html=True)
             
             # 광고 B
-            components.html(f"""<div style="display:flex;justify-content:center;"><script async src="https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js?client={ADSENSE_CLIENT_ID}" crossorigin="anonymous"></script><ins class="adsbygoogle" style="display:inline-block;width:300px;height:100px" data-ad-client="{ADSENSE_CLIENT_ID}" data-ad-slot="{ADSENSE_SLOT_ID}"></ins><script>(adsbygoogle = window.adsbygoogle || []).push({{}});</script></div>""", height=110)
+            render_ad(300, 100, frame_height=110)
 
             st.write("---")
             st.caption("위 분석을 바탕으로 시뮬레이션을 시작합니다.")
             
             # 버튼 하단 배치
-            if st.button("💬 실전 시뮬레이션 채팅 입장", use_container_width=True):
+            if st.button("💬 실전 시뮬레이션 채팅 입장", width="stretch"):
                  st.session_state.messages = []
                  st.session_state.step = 4
                  st.rerun()
@@ -523,140 +682,25 @@ else:
     elif st.session_state.step == 4:
         st.markdown(f"##### 💬 {st.session_state.target_name}님과의 대화방")
         
-        chat_container = st.container()
-        
-        with chat_container:
-            if not st.session_state.messages:
-                st.info(f"'{st.session_state.target_name}'님에게 보낼 첫 메시지를 입력해보세요.")
-            
+        # 이전 대화는 전체 실행 때만 그리고, 대화방 조각(chat_room)은 그 뒤에 새로 오간 메시지만 그립니다.
+        # 그래서 채팅 한 턴의 서버 작업은 지금까지의 대화 길이와 상관없이 최대 CHAT_TAIL_MESSAGES 개 분량입니다.
+        with st.container():
+            if st.session_state.trimmed_messages:
+                st.caption(f"💾 오래된 대화 {st.session_state.trimmed_messages}개는 정리되었어요.")
             for m in st.session_state.messages:
-                if m["role"] == "user":
-                    # 유저 (오른쪽, 보라색)
-                    st.markdown(f"""
-                    <div class="chat-row chat-row-user">
-                        <div class="chat-bubble user-bubble">
-                            {m["content"]}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    # AI (왼쪽, 흰색)
-                    try:
-                        data = json.loads(m["content"])
-                        reply_text = data.get("reply", "...")
-                        emotion = data.get("emotion", "😐")
-                        thoughts = data.get("thoughts", "")
-                        tips = data.get("tips", "")
-                        warning = data.get("warning", "")
-                    except:
-                        reply_text = m["content"]
-                        emotion = "🤖"
-                        thoughts = "데이터 없음"
-                        tips = "" 
-                        warning = ""
-
-                    col_profile, col_bubble = st.columns([1, 7])
-                    with col_profile:
-                        st.markdown(f'<div class="chat-profile">{emotion}</div>', unsafe_allow_html=True)
-                    with col_bubble:
-                        st.markdown(f"""
-                        <div class="chat-row chat-row-bot">
-                            <div class="chat-bubble bot-bubble">
-                                {reply_text}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # 속마음 보기 (Expander) - 말풍선 바로 아래 위치, 기본적으로 닫혀있음
-                        with st.expander("🔍 속마음 & 공략팁 (Click)"):
-                            st.markdown(f"""
-                            **🧠 속마음:** {thoughts}  
-                            **💡 공략팁:** {tips}  
-                            **⚠️ 주의:** {warning}
-                            """)
-                
-            # 하단 여백 확보 (입력창에 가려지지 않게)
-            st.write("<br>" * 3, unsafe_allow_html=True)
-
-        # 입력창 (st.chat_input은 자동으로 하단 고정됨. CSS로 흰 창 내부에 있는 것처럼 보이게 디자인함)
-        if user_input := st.chat_input("메시지 입력..."):
-            # 사용자 메시지 추가
-            st.session_state.messages.append({"role": "user", "content": user_input})
-            st.rerun() # 즉시 렌더링 후 AI 답변 생성 트리거
-
-        # AI 답변 생성 로직 (사용자 메시지가 방금 추가된 경우)
-        if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
-            with st.spinner(f"{st.session_state.target_name}님이 입력 중..."):
-                try:
-                    user_last_msg = st.session_state.messages[-1]["content"]
-                    # [수정] JSON 포맷 강제 및 1순위 답장만 생성하도록 유도
-                    p = f"""
-                    역할: {st.session_state.target_name} ({st.session_state.analysis_result})
-                    현재상황: {st.session_state.selected_scenario}
-                    
-                    유저가 당신에게 메시지를 보냈습니다: "{user_last_msg}"
-                    
-                    [미션]
-                    1. 당신(페르소나)의 말투로 **가장 적절한 답장(reply)** 하나를 작성하세요. (카톡 말투, 짧게,확률표시시)
-                    2. 현재 당신의 **감정(emotion)**을 이모티콘 하나로 표현하세요.
-                    3. 당신의 **속마음(thoughts)**, 유저를 위한 **공략팁(tips)**, **주의사항(warning)**을 분석하세요.
-                    
-                    [반드시 JSON 형식으로만 출력하세요]
-                    {{
-                        "reply": "여기에 답장 내용",
-                        "emotion": "🥰",
-                        "thoughts": "여기에 속마음",
-                        "tips": "여기에 팁",
-                        "warning": "여기에 주의사항"
-                    }}
-                    """
-                    response_text = ai_manager.generate_response(p)
-                    clean_json = response_text.replace("```json", "").replace("```", "").strip()
-                    
-                    st.session_state.messages.append({"role": "assistant", "content": clean_json})
-                    st.rerun()
-                    
-                except Exception as e:
-                    st.error(f"🚫 시스템 오류 발생: {e}")
-                    st.code(traceback.format_exc()) # 상세 에러 로그 출력 (어디서 틀렸는지 줄번호까지 나옴)
+                render_chat_message(m)
+        st.session_state.chat_tail = []
+
+        chat_room()
 
-        # [Step 4의 기존 버튼 코드 자리에 덮어쓰세요]
-        
         # 하단 여백 및 구분선
         st.write("<br>" * 3, unsafe_allow_html=True)
         st.write("---") 
 
-        # 버튼 2개 나란히 배치 (왼쪽: 처음으로 / 오른쪽: 공유하기)
-        c1, c2 = st.columns(2)
-        
-        with c1:
-            # 처음으로 버튼
-            if st.button("🔄 처음부터 다시하기", use_container_width=True, key="btn_restart_final"):
-                session_manager.reset()
-                st.rerun()
-                
-        with c2:
-            # [수정됨] "🔗 공유하기" 버튼
-            # 누르면 아래에 공유창(URL 복사 등)이 열렸다 닫혔다 함
-            if st.button("🔗 공유하기", use_container_width=True, key="btn_toggle_share"):
-                st.session_state.show_share = not st.session_state.show_share
-                st.rerun()
+        share_panel()
 
-        # 공유하기 스위치가 켜져있으면 UI 보여주기
-        if st.session_state.show_share:
-            st.markdown("""
-                <div style="background-color:#f8f9fa; padding:20px; border-radius:15px; margin-top:15px; border:1px solid #eee;">
-                """, unsafe_allow_html=True)
-            
-            # 제목 변경: 결과 공유하기 -> 공유하기
-            st.markdown("<h5 style='text-align:center; color:#333; margin-bottom:15px;'>🔗 공유하기</h5>", unsafe_allow_html=True)
-            
-            # 1. URL 복사 기능 (가장 중요)
-            share_url = "https://mind-scan.ai.kr"
-            st.code(share_url, language=None) # 사용자가 꾹 눌러서 복사하기 편하게 코드 블록으로 제공
-            st.caption("👆 위 링크를 복사해서 친구에게 보내보세요!")
-            
-            st.write("---")
-            
-    
+# 다른 레플리카에서도 이어갈 수 있게 이번 실행에서 바뀐 진행 상태를 저장
+session_manager.persist()
 
+# 정상적으로 끝난 실행의 렌더링 시간 (st.rerun()/st.stop() 으로 중단된 실행은 제외)
+metrics.observe("script_run_seconds", time.perf_counter() - run_started, step=run_step)
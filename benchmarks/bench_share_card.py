@@ -0,0 +1,114 @@
+"""공유 카드 렌더링 마이크로 벤치마크.
+
+    python benchmarks/bench_share_card.py [--repeat 20]
+
+기존 방식(파이썬 리스트로 1.26M 픽셀 마스크 생성)과 새 그라데이션 엔진,
+그리고 배경 캐시를 쓰는 카드 1장당 렌더링 시간을 비교합니다.
+마지막으로 같은 카드를 형식/품질별로 인코딩했을 때의 크기와 인코딩 시간을 출력합니다.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from mindscan import share_card  # noqa: E402
+from mindscan.profile import parse_profile  # noqa: E402
+from mindscan.image_export import ExportSpec, encode  # noqa: E402
+
+WIDTH, HEIGHT = 900, 1400
+START, END = "#667eea", "#764ba2"
+
+SAMPLE_TEXT = """**[Profile]**
+**👾 난이도**: [중] 겉은 차갑지만 속은 따뜻한 반전 매력
+**⚔️ 강점**: #통찰력 #공감능력 #창의성
+**🩸 약점**: #내향성 #감정 기복 #예민함
+
+**✨ 타고난 성향**
+
+처음에는 조심스럽지만 한 번 마음을 열면 깊이 있는 관계를 원하는 타입입니다.
+
+**🗣️ 대화 스타일**
+
+짧고 담백한 답장을 선호하지만, 관심 있는 주제에는 길게 이야기합니다.
+"""
+
+
+def legacy_gradient(width, height, start_color, end_color):
+    """기존 구현: 행마다 리스트를 늘려 putdata 하는 방식."""
+    base = Image.new('RGB', (width, height), start_color)
+    top = Image.new('RGB', (width, height), end_color)
+    mask = Image.new('L', (width, height))
+    mask_data = []
+    for y in range(height):
+        mask_data.extend([int(255 * (y / height))] * width)
+    mask.putdata(mask_data)
+    return Image.composite(top, base, mask)
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+# 인코딩 비교 대상 (첫 줄은 기존처럼 양자화 없이 저장한 PNG)
+EXPORT_SPECS = [
+    ExportSpec("full", "PNG", colors=0),
+    ExportSpec("full", "PNG", colors=256),
+    ExportSpec("full", "PNG", colors=256, max_bytes=10 * 1024),
+    ExportSpec("full", "WEBP", quality=85),
+    ExportSpec("full", "WEBP", quality=85, max_bytes=30 * 1024),
+    ExportSpec("full", "JPEG", quality=85),
+    ExportSpec("thumb", "WEBP", width=360, quality=75),
+    ExportSpec("thumb", "JPEG", width=360, quality=75),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    assert legacy_gradient(WIDTH, HEIGHT, START, END).tobytes() == \
+        share_card.create_gradient_image(WIDTH, HEIGHT, START, END).tobytes(), "그라데이션 결과가 달라졌습니다"
+
+    manager = share_card.ShareManager()
+    profile = parse_profile(SAMPLE_TEXT)
+    render = lambda: manager.create_result_image("결과", "민지", profile)  # noqa: E731
+
+    legacy_ms = timeit(lambda: legacy_gradient(WIDTH, HEIGHT, START, END), args.repeat)
+    gradient_ms = timeit(lambda: share_card.create_gradient_image(WIDTH, HEIGHT, START, END), args.repeat)
+
+    # 카드 전체: 배경 캐시가 비어 있는 경우(cold)와 채워진 경우(warm)
+    original = share_card.create_gradient_image
+    share_card.create_gradient_image = legacy_gradient
+    share_card._build_card_background.cache_clear()
+    card_before_ms = timeit(lambda: (share_card._build_card_background.cache_clear(), render()), args.repeat)
+    share_card.create_gradient_image = original
+    share_card._build_card_background.cache_clear()
+    card_cold_ms = timeit(lambda: (share_card._build_card_background.cache_clear(), render()), args.repeat)
+    render()
+    card_warm_ms = timeit(render, args.repeat)
+
+    print(f"gradient  legacy : {legacy_ms:8.2f} ms")
+    print(f"gradient  column : {gradient_ms:8.2f} ms")
+    print(f"card      before : {card_before_ms:8.2f} ms  (legacy gradient, no cache)")
+    print(f"card      cold   : {card_cold_ms:8.2f} ms  (new gradient, no cache)")
+    print(f"card      warm   : {card_warm_ms:8.2f} ms  (cached background copy)")
+
+    img = manager._draw_result_image("결과", "민지", profile)
+    print(f"\n{'variant':<8}{'format':<6}{'width':>6}{'quality':>8}{'colors':>7}{'target KB':>10}{'KB':>8}{'encode ms':>11}")
+    for spec in EXPORT_SPECS:
+        image = encode(img, spec)
+        encode_ms = timeit(lambda: encode(img, spec), max(args.repeat // 4, 1))
+        print(f"{spec.name:<8}{spec.fmt:<6}{image.width:>6}{spec.quality:>8}{spec.colors:>7}"
+              f"{(spec.max_bytes or 0) // 1024:>10}{image.size / 1024:>8.1f}{encode_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Step 4 채팅 한 턴에 app.py 가 몇 번 실행되고 서버에서 얼마나 걸리는지 재는 벤치마크.
+
+    python benchmarks/chat_turns.py --turns 30
+
+MINDSCAN_MODEL_BACKEND=fake 로 대화방까지 들어간 뒤 같은 대화를 두 가지 방식으로 이어갑니다.
+  - app:      메시지마다 전체 app.py 를 다시 실행 (조각 없이 동작하던 방식과 같은 범위)
+  - fragment: 브라우저처럼 대화방 조각(chat_room)만 다시 실행
+턴마다 전체/조각 실행 횟수(SCRIPT_STARTED)와 스크립트 실행 시간(AppTest 자체 오버헤드 제외)을 모아, 대화가 길어질 때
+앞/뒤 구간의 턴당 시간을 비교합니다 (조각 실행은 대화 길이와 상관없이 일정해야 함).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("MINDSCAN_MODEL_BACKEND", "fake")
+os.environ.setdefault("MINDSCAN_RENDER_WORKERS", "0")
+os.environ.setdefault("MINDSCAN_FAKE_FIRST_TOKEN_LATENCY", "0")
+os.environ.setdefault("MINDSCAN_FAKE_CHUNK_LATENCY", "0")
+
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent  # noqa: E402
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# 실제 서버처럼 컴파일된 스크립트를 재사용 (AppTest 는 실행마다 app.py 를 다시 컴파일함)
+_script_cache = ScriptCache()
+app_test.ScriptCache = local_script_runner.ScriptCache = lambda: _script_cache
+
+# AppTest 는 위젯 조작을 항상 전체 실행으로 처리하므로, fragment 모드에서는
+# 브라우저가 보내는 것처럼 rerun 요청에 조각 ID 를 실어 보냅니다.
+_fragment_queue = []
+_script_runs = []  # 이번 턴의 [시작 시각, 걸린 시간, 조각 실행 여부] 목록
+_RerunData = local_script_runner.RerunData
+local_script_runner.RerunData = lambda **kwargs: _RerunData(fragment_id_queue=list(_fragment_queue), **kwargs)
+_run = local_script_runner.LocalScriptRunner.run
+
+
+def _on_event(sender, event, **kwargs):
+    if event == ScriptRunnerEvent.SCRIPT_STARTED:
+        _script_runs.append([time.perf_counter(), None, bool(kwargs.get("fragment_ids_this_run"))])
+    elif "STOPPED" in event.name and _script_runs and _script_runs[-1][1] is None:
+        _script_runs[-1][1] = time.perf_counter() - _script_runs[-1][0]
+
+
+def _counting_run(self, *args, **kwargs):
+    self.on_event.connect(_on_event, weak=False)
+    return _run(self, *args, **kwargs)
+
+
+local_script_runner.LocalScriptRunner.run = _counting_run
+
+
+def open_chat_room(timeout: float) -> AppTest:
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state.step = 4
+    at.session_state.target_name = "민지"
+    at.session_state.analysis_result = "**👾 난이도**: [중] 겉은 차갑지만 속은 따뜻한 반전 매력"
+    at.session_state.general_analysis = "**🎯 핵심 분석 (승률 65%)**\n생각을 정리할 시간이 필요한 상태입니다."
+    at.run()
+    if at.exception: raise RuntimeError(at.exception[0].message)
+    return at
+
+
+def run_turns(mode: str, turns: int, timeout: float):
+    at = open_chat_room(timeout)
+    if mode == "fragment":
+        _fragment_queue[:] = at._fragment_storage.resolve_target("chat_room")
+    times, app_runs, fragment_runs = [], [], []
+    try:
+        for turn in range(turns):
+            del _script_runs[:]
+            at.chat_input(key="chat_draft").set_value(f"안녕 {turn}").run()
+            times.append(sum(elapsed or 0.0 for _, elapsed, _ in _script_runs))
+            fragment_runs.append(sum(1 for *_, fragment in _script_runs if fragment))
+            app_runs.append(len(_script_runs) - fragment_runs[-1])
+            if at.exception: raise RuntimeError(at.exception[0].message)
+    finally:
+        _fragment_queue[:] = []
+    if len(at.session_state.messages) < 2 * turns - 1:
+        raise RuntimeError(f"{mode}: 답장이 누락되었습니다 ({len(at.session_state.messages)}개)")
+    return times, app_runs, fragment_runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--window", type=int, default=5, help="앞/뒤 비교 구간의 턴 수")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    open_chat_room(args.timeout)  # 모듈 import/캐시 리소스 생성 (측정 제외)
+    print(f"{'mode':<10}{'turns':>6}{'app runs':>10}{'frag runs':>10}{'mean ms':>10}{'p50 ms':>9}{'first ms':>10}{'last ms':>10}")
+    for mode in ("app", "fragment"):
+        times, app_runs, fragment_runs = run_turns(mode, args.turns, args.timeout)
+        w = min(args.window, len(times))
+        print(f"{mode:<10}{len(times):>6}{statistics.mean(app_runs):>10.2f}{statistics.mean(fragment_runs):>10.2f}"
+              f"{statistics.mean(times) * 1000:>10.1f}{statistics.median(times) * 1000:>9.1f}"
+              f"{statistics.mean(times[:w]) * 1000:>10.1f}{statistics.mean(times[-w:]) * 1000:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""새 워커 프로세스의 첫 실행(cold start) 비용을 재는 벤치마크.
+
+    python benchmarks/cold_start.py [--repeat 3] [--top 8]
+
+매번 새 파이썬 프로세스를 `-X importtime` 으로 띄워 app.py 를 AppTest 로 한 번 실행합니다.
+  - step0: 랜딩 페이지 (새 유저가 가장 먼저 보는 화면)
+  - full:  4단계 대화방 + 공유창 (카드 렌더링/QR/LLM SDK 까지 모두 사용)
+두 경우 모두 실제 SDK 경로를 타도록 gemini 백엔드에 가짜 API 키를 넣습니다 (모델 호출은 하지 않음).
+첫 실행 시간, import 에 쓴 시간, 패키지별 import 시간 상위 항목, 무거운 모듈을 불러왔는지를 출력합니다.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# 랜딩 페이지에서는 불러오지 않아야 하는 모듈
+HEAVY_MODULES = ["google.generativeai", "grpc", "PIL.Image", "PIL.ImageDraw", "qrcode", "mindscan.share_card"]
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.secrets["GOOGLE_API_KEY"] = "cold-start-benchmark"
+if {scenario!r} == "full":
+    at.session_state.step = 4
+    at.session_state.target_name = "민지"
+    at.session_state.analysis_result = "**👾 난이도**: [중] 겉은 차갑지만 속은 따뜻한 반전 매력"
+    at.session_state.general_analysis = "**🎯 핵심 분석 (승률 65%)**"
+    at.session_state.show_share = True
+    at.session_state.messages = []
+at.run()
+finished = time.perf_counter()
+if at.exception: raise SystemExit(at.exception[0].message)
+print(json.dumps({{"streamlit_seconds": imported - started, "first_run_seconds": finished - imported,
+                  "modules": len(sys.modules), "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """-X importtime 출력에서 (전체 import 시간, 최상위 패키지별 self 시간 합) 을 초 단위로 돌려줍니다."""
+    by_package = defaultdict(float)
+    total = 0.0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        seconds = int(self_us) / 1e6
+        total += seconds
+        by_package[name.strip().split(".")[0]] += seconds
+    return total, by_package
+
+
+def run_once(scenario: str):
+    env = dict(os.environ, MINDSCAN_MODEL_BACKEND="gemini", MINDSCAN_RENDER_WORKERS="0")
+    code = CHILD.format(app=APP_PATH, scenario=scenario, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=300)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{scenario}: {proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["import_seconds"], result["by_package"] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="import 시간 상위 패키지 개수")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<10}{'first run ms':>14}{'imports ms':>12}{'modules':>9}  heavy modules loaded")
+    packages = {}
+    for scenario in ("step0", "full"):
+        runs = [run_once(scenario) for _ in range(args.repeat)]
+        first_ms = statistics.median(r["first_run_seconds"] for r in runs) * 1000
+        import_ms = statistics.median(r["import_seconds"] for r in runs) * 1000
+        modules = statistics.median(r["modules"] for r in runs)
+        print(f"{scenario:<10}{first_ms:>14.1f}{import_ms:>12.1f}{modules:>9.0f}  {', '.join(runs[-1]['loaded']) or '-'}")
+        packages[scenario] = runs[-1]["by_package"]
+
+    for scenario, by_package in packages.items():
+        top = sorted(by_package.items(), key=lambda item: -item[1])[:args.top]
+        print(f"\n[{scenario}] import 시간 상위 패키지: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""로컬 가짜 모델로 여러 세션을 0→4단계까지 동시에 돌려보는 부하 테스트.
+
+    python benchmarks/load_test.py --sessions 20 --concurrency 5 --chat-turns 3
+
+API 키 없이 MINDSCAN_MODEL_BACKEND=fake 로 app.py 를 streamlit.testing.v1.AppTest 로
+실행하고, 단계별 p50/p95 지연 시간과 메모리 사용량을 출력합니다.
+AppTest 는 프로세스 전역 상태(Runtime, 스크립트 캐시)를 바꿔 가며 실행되므로 한 프로세스에서 동시에 하나만 돌립니다.
+세션은 --concurrency 개의 워커 프로세스에서 하나씩 실행하고, 워커 안의 캐시(분석 캐시, 게이트웨이)는
+그 워커가 이어서 실행하는 세션끼리 공유합니다. 워커끼리 캐시를 나누려면 MINDSCAN_SHARED_STORE 를 지정합니다.
+가짜 모델 지연/청크/오류율은 MINDSCAN_FAKE_* 환경변수로 조절합니다 (mindscan/model_backends.py).
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("MINDSCAN_MODEL_BACKEND", "fake")
+os.environ.setdefault("MINDSCAN_RENDER_WORKERS", "0")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+SITUATIONS = ["어제 싸우고 연락이 없는데 무슨 심리일까?", "읽씹 당했어요", "갑자기 말투가 차가워졌어요", "주말에 만나자고 해도 될까?"]
+
+
+class SessionFailed(RuntimeError):
+    pass
+
+
+def _check(at: AppTest, step: str):
+    if at.exception:
+        raise SessionFailed(f"{step}: {at.exception[0].message}")
+    if at.error:
+        raise SessionFailed(f"{step}: {at.error[0].value}")
+
+
+@contextmanager
+def _keep_main():
+    """AppTest 는 __main__ 을 app.py 로 바꿔 두므로, 끝나면 워커의 __main__ 을 되돌려 다음 작업을 받을 수 있게 합니다."""
+    main = sys.modules["__main__"]
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _init_worker(timeout: float, trace: bool):
+    # 워커마다 첫 실행에서 스크립트 컴파일/모듈 import/캐시 리소스 생성을 끝내 둡니다 (측정 제외).
+    with _keep_main():
+        AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+    if trace: tracemalloc.start()
+
+
+def run_session(index: int, args) -> Tuple[Dict[str, List[float]], Optional[int]]:
+    """워커 프로세스에서 세션 하나를 0→4단계까지 실행하고 (단계별 시간, 파이썬 힙 최대치) 를 돌려줍니다."""
+    with _keep_main():
+        return _run_session(index, args)
+
+
+def _run_session(index: int, args) -> Tuple[Dict[str, List[float]], Optional[int]]:
+    rng = random.Random(args.seed + index)
+    timings = defaultdict(list)
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+
+    def step(name, action):
+        started = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            raise SessionFailed(f"{name}: {e!r}") from e
+        elapsed = time.perf_counter() - started
+        _check(at, name)
+        timings[name].append(elapsed)
+
+    step("0 landing", at.run)
+    step("1 target form", lambda: at.button[0].click().run())
+
+    def submit_target():
+        at.text_input[0].input(f"사용자{index}")
+        at.date_input[0].set_value(datetime.date(1990, 1, 1) + datetime.timedelta(days=rng.randrange(args.distinct_births)))
+        at.button[0].click().run()
+    step("2 analysis", submit_target)
+    step("3 situation form", lambda: at.button[0].click().run())
+
+    def submit_situation():
+        at.text_area[0].input(rng.choice(SITUATIONS))
+        at.button[0].click().run()
+    step("3.5 prediction", submit_situation)
+    step("4 chat room", lambda: at.button[0].click().run())
+    for turn in range(args.chat_turns):
+        step("4 chat turn", lambda: at.chat_input[0].set_value(f"안녕 {turn}").run())
+    if args.share:
+        step("share panel", lambda: at.button(key="btn_toggle_share").click().run())
+    return dict(timings), tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values: return 0.0
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--chat-turns", type=int, default=3)
+    parser.add_argument("--distinct-births", type=int, default=50, help="생년월일 종류 수 (작을수록 분석 캐시 적중)")
+    parser.add_argument("--share", action="store_true", help="공유 패널(카드 렌더링)까지 실행")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="파이썬 힙 사용량 추적 (느려짐)")
+    args = parser.parse_args()
+
+    timings = defaultdict(list)
+    failures = []
+    heap_peak = 0
+    # 워커를 모두 띄우고 준비 실행까지 끝낸 뒤부터 측정 (워커 수만큼 빈 작업을 넣어 한꺼번에 띄움)
+    pool = ProcessPoolExecutor(max_workers=args.concurrency, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(args.timeout, args.tracemalloc))
+    with pool:
+        for future in [pool.submit(time.sleep, 0.5) for _ in range(args.concurrency)]: future.result()
+        started = time.perf_counter()
+        futures = [pool.submit(run_session, i, args) for i in range(args.sessions)]
+        for future in futures:
+            try:
+                session_timings, session_heap = future.result()
+            except Exception as e:
+                failures.append(repr(e))
+                continue
+            for name, values in session_timings.items(): timings[name].extend(values)
+            heap_peak = max(heap_peak, session_heap or 0)
+        wall = time.perf_counter() - started
+
+    print(f"sessions={args.sessions} concurrency={args.concurrency} failures={len(failures)} wall={wall:.2f}s "
+          f"throughput={(args.sessions - len(failures)) / wall:.2f} sessions/s")
+    print(f"{'step':<18}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, values in timings.items():
+        print(f"{name:<18}{len(values):>5}{percentile(values, 0.5) * 1000:>10.1f}"
+              f"{percentile(values, 0.95) * 1000:>10.1f}{statistics.mean(values) * 1000:>10.1f}")
+    # 워커 프로세스 중 가장 큰 RSS (종료된 자식 프로세스 기준)
+    rss_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"memory: max worker RSS={rss_mb:.1f}MB")
+    if args.tracemalloc:
+        print(f"memory: python heap peak per worker={heap_peak / 1e6:.1f}MB")
+    for failure in failures[:5]:
+        print("FAILED:", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""레플리카 두 개가 공유 저장소(MINDSCAN_SHARED_STORE)로 캐시와 세션을 나눠 쓰는지 확인하는 벤치마크.
+
+    python benchmarks/replicas.py [--chat-turns 3]
+
+레플리카마다 새 파이썬 프로세스를 띄우고(프로세스 캐시가 빈 상태) app.py 를 AppTest 로 실행합니다.
+  - 레플리카 A: 0→4단계 + 채팅 + 공유 카드까지 진행하고 URL 의 세션 토큰(?s=...)을 넘김
+  - 레플리카 B: 같은 토큰으로 세션을 이어서 채팅 한 턴을 더 보내고, 같은 성별/생년월일의 새 세션으로 Step 2/공유 카드를 실행
+B 를 공유 저장소 없이(none)와 같은 SQLite 파일로(shared) 각각 실행해 이어하기 여부, Step 2/카드 시간, 캐시 적중을 비교합니다.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+CHILD_COMMON = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+from mindscan.metrics import metrics
+
+def check(at):
+    if at.exception: raise SystemExit(at.exception[0].message)
+
+def timed_run(widget):
+    started = time.perf_counter()
+    at = widget.run()
+    check(at)
+    return at, time.perf_counter() - started
+
+def open_share(at):
+    # 공유창을 열고 카드가 완성될 때까지 (렌더링은 MINDSCAN_RENDER_WORKERS=0 으로 스크립트 스레드에서 바로 끝남)
+    return timed_run(next(b for b in at.button if b.key == "btn_toggle_share").click())
+
+def new_session(name):
+    at = AppTest.from_file({app!r}, default_timeout=120)
+    at.run(); check(at)
+    at.button[0].click().run(); check(at)
+    at.text_input[0].input(name)
+    return timed_run(at.button[0].click())
+
+def cache_gauges():
+    gauges = metrics.snapshot()["gauges"]
+    return {{"analysis_hits": gauges.get("analysis_cache", {{}}).get("hits", 0),
+            "card_shared_hits": gauges.get("card_cache", {{}}).get("shared_hits", 0)}}
+"""
+
+CHILD_A = CHILD_COMMON + r"""
+at, step2 = new_session("민지")
+at.button[0].click().run(); check(at)
+at.text_area[0].input("어제 싸우고 연락이 없는데 무슨 심리일까?"); at.button[0].click().run(); check(at)
+at.button[0].click().run(); check(at)
+for turn in range({turns}):
+    at.chat_input(key="chat_draft").set_value(f"안녕 {{turn}}").run(); check(at)
+at, card = open_share(at)
+print(json.dumps({{"token": at.query_params.get("s"), "step2_seconds": step2,
+                  "card_seconds": card, "messages": len(at.session_state.messages), **cache_gauges()}}))
+"""
+
+CHILD_B = CHILD_COMMON + r"""
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.query_params["s"] = {token!r}
+started = time.perf_counter()
+at.run(); check(at)
+resume = time.perf_counter() - started
+resumed = {{"step": at.session_state.step, "messages": len(at.session_state.messages)}}
+if at.session_state.step == 4:
+    at.chat_input(key="chat_draft").set_value("아까 하던 얘기 계속하자").run(); check(at)
+    resumed["messages_after_turn"] = len(at.session_state.messages)
+
+# 다른 사람이 같은 성별/생년월일(기본값)로 시작: 분석/카드는 공유 저장소에서 가져올 수 있음
+at, step2 = new_session("민지")
+at.session_state.step = 4
+at.session_state.general_analysis = "**🎯 핵심 분석 (승률 65%)**"
+at.run(); check(at)
+at, card = open_share(at)
+print(json.dumps({{"resume_seconds": resume, **resumed, "step2_seconds": step2, "card_seconds": card, **cache_gauges()}}))
+"""
+
+
+def run_replica(code: str, store: str = None):
+    env = dict(os.environ, MINDSCAN_MODEL_BACKEND="fake", MINDSCAN_RENDER_WORKERS="0")
+    env.setdefault("MINDSCAN_FAKE_FIRST_TOKEN_LATENCY", "0.3")
+    env.pop("MINDSCAN_SHARED_STORE", None)
+    if store: env["MINDSCAN_SHARED_STORE"] = store
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=600)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:] or proc.stdout[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chat-turns", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, "shared.db")
+        a = run_replica(CHILD_A.format(app=APP_PATH, turns=args.chat_turns), store)
+        print(f"replica A: step2 {a['step2_seconds'] * 1000:.0f}ms, card {a['card_seconds'] * 1000:.0f}ms, "
+              f"messages {a['messages']}, token {'yes' if a['token'] else 'no'}")
+        print(f"{'replica B':<11}{'resumed':>9}{'messages':>10}{'resume ms':>11}{'step2 ms':>10}{'card ms':>9}"
+              f"{'analysis hits':>15}{'card shared hits':>18}")
+        failed = False
+        for mode in ("none", "shared"):
+            b = run_replica(CHILD_B.format(app=APP_PATH, token=a["token"]), store if mode == "shared" else None)
+            resumed = b["step"] == 4 and b["messages"] == a["messages"]
+            print(f"{mode:<11}{'yes' if resumed else 'no':>9}{b.get('messages_after_turn', b['messages']):>10}"
+                  f"{b['resume_seconds'] * 1000:>11.0f}{b['step2_seconds'] * 1000:>10.0f}{b['card_seconds'] * 1000:>9.0f}"
+                  f"{b['analysis_hits']:>15}{b['card_shared_hits']:>18}")
+            failed |= mode == "shared" and not (resumed and b["analysis_hits"] and b["card_shared_hits"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
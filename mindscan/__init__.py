@@ -0,0 +1,5 @@
+"""마인드스캔 앱의 보조 모듈 모음입니다.
+
+Streamlit은 app.py를 매 rerun마다 다시 실행하므로, 프로세스 전체에서
+재사용해야 하는 캐시와 렌더링 로직은 이 패키지의 모듈에 둡니다.
+"""
@@ -0,0 +1,80 @@
+import time
+from typing import Dict, Iterator, List, Optional
+
+from mindscan.chat_context import usage_prompt_tokens
+from mindscan.image_prep import PreparedImage, as_content_part
+from mindscan.llm_gateway import LLMGateway, request_key
+from mindscan.metrics import TOKEN_BUCKETS, metrics
+from mindscan.model_backends import model_registry
+from mindscan.qr_service import qr_service
+
+
+# ==========================================
+# [모델 호출] 앱과 일괄 실행 CLI 가 함께 사용
+# ==========================================
+class MindScanConfig:
+    def __init__(self):
+        self.SERVICE_URL = "https://mind-scan.ai.kr"
+        self.MODEL_PREFERENCES = ["gemini-2.5-flash"]
+        self.SAFETY_SETTINGS = [{"category": c, "threshold": "BLOCK_NONE"} for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"]]
+
+    def get_qr_code(self, url: str) -> str:
+        # 프로세스 단위 QR 캐시에서 data URI를 가져옵니다 (SERVICE_URL은 시작 시 미리 생성)
+        return qr_service.data_uri(url)
+
+
+class AIModelManager:
+    def __init__(self, config: MindScanConfig, gateway: Optional[LLMGateway] = None):
+        self.config = config
+        self.gateway = gateway or LLMGateway.from_env()
+        self.last_prompt_tokens = None
+
+    def _call_model(self, fn):
+        # MODEL_PREFERENCES 순서대로, 쓸 수 없는 모델이면 다음 모델로 (클라이언트는 model_registry 가 공유)
+        return model_registry.call(self.config.MODEL_PREFERENCES, self.config.SAFETY_SETTINGS, fn)
+
+    @staticmethod
+    def _instrumented(response, step: str) -> Iterator[str]:
+        """첫 조각까지의 시간, 전체 시간, 입력/출력 토큰 수를 단계별로 기록합니다."""
+        started = time.perf_counter()
+        first = True
+        for chunk in response:
+            if first:
+                metrics.observe("llm_first_chunk_seconds", time.perf_counter() - started, step=step)
+                first = False
+            yield chunk
+        metrics.observe("llm_seconds", time.perf_counter() - started, step=step)
+        usage = getattr(response.response, "usage_metadata", None)
+        if usage:
+            metrics.observe("llm_prompt_tokens", usage.prompt_token_count, buckets=TOKEN_BUCKETS, step=step)
+            metrics.observe("llm_response_tokens", usage.candidates_token_count, buckets=TOKEN_BUCKETS, step=step)
+
+    def _generate(self, prompt: str, image: Optional[PreparedImage], stream: bool):
+        content = [prompt]
+        if image: content.append(as_content_part(image))
+        key = request_key("generate", prompt, image.data if image else b"")
+        options = {"timeout": self.gateway.timeout}
+        return self.gateway.stream(key, lambda: self._call_model(
+            lambda model: model.generate_content(content, stream=stream, request_options=options)), stream=stream)
+
+    def generate_response(self, prompt: str, image: Optional[PreparedImage] = None, stream: bool = False, step: str = ""):
+        response = self._instrumented(self._generate(prompt, image, stream=stream), step)
+        return response if stream else "".join(response)
+
+    def prefetch(self, prompt: str, image: Optional[PreparedImage] = None):
+        """응답을 기다리지 않고 호출만 먼저 시작합니다. 같은 요청이 오면 게이트웨이가 이 호출에 합쳐 줍니다."""
+        return self._generate(prompt, image, stream=True)
+
+    def stream_response(self, prompt: str, image: Optional[PreparedImage] = None, step: str = "") -> Iterator[str]:
+        """응답을 생성되는 대로 텍스트 조각(chunk) 단위로 돌려줍니다."""
+        yield from self._instrumented(self._generate(prompt, image, stream=True), step)
+
+    def stream_chat(self, history: List[Dict], message: str, generation_config: Optional[Dict] = None, fresh: bool = False, step: str = "4") -> Iterator[str]:
+        """대화 기록(history)을 붙여 채팅 응답을 스트리밍합니다. 끝나면 last_prompt_tokens 에 입력 토큰 수를 남깁니다."""
+        self.last_prompt_tokens = None
+        key = request_key("chat", history, message, generation_config)
+        options = {"timeout": self.gateway.timeout}
+        response = self.gateway.stream(key, lambda: self._call_model(lambda model: model.start_chat(history=history).send_message(
+            message, stream=True, generation_config=generation_config, request_options=options)), fresh=fresh)
+        yield from self._instrumented(response, step)
+        self.last_prompt_tokens = usage_prompt_tokens(response.response)
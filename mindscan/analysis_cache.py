@@ -0,0 +1,238 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from mindscan.shared_state import SharedStore
+
+# Step 2 프롬프트는 대상 이름 대신 이 토큰을 보내므로(mindscan/prompts.py) 캐시에는 이름이 들어가지 않고,
+# 같은 생일/성별이면 이름이 달라도 재사용합니다. 이름은 꺼내서 보여줄 때만 채웁니다.
+NAME_TOKEN = "{{target_name}}"
+
+
+def _normalize(value) -> str:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return unicodedata.normalize("NFC", " ".join(str(value).split())).lower()
+
+
+def analysis_key(model_name: str, prompt_version: str, **inputs) -> str:
+    """모델 이름 + 프롬프트 버전 + 정규화한 입력값으로 캐시 키를 만듭니다."""
+    payload = {"model": model_name, "prompt": prompt_version, **{k: _normalize(v) for k, v in inputs.items()}}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# ==========================================
+# [백엔드] 프로세스 메모리 LRU / SQLite 파일
+# ==========================================
+class CacheBackend:
+    """분석 캐시 저장소 인터페이스. 값은 JSON으로 직렬화 가능한 dict 입니다."""
+
+    def get(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict, ttl: float):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_items: int = 1024):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None: return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict, ttl: float):
+        with self._lock:
+            self._items[key] = (time.time() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteBackend(CacheBackend):
+    """여러 워커 프로세스가 같은 파일을 공유할 수 있는 SQLite 저장소."""
+
+    def __init__(self, path: str, max_items: int = 50000):
+        self.path = path
+        self.max_items = max_items
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS analysis_cache_last_used ON analysis_cache (last_used)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드 간 공유하지 않고 스레드마다 하나씩 엽니다.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+        if row is None: return None
+        with conn:
+            if row[1] < now:
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE analysis_cache SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict, ttl: float):
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl, now),
+            )
+            conn.execute("DELETE FROM analysis_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM analysis_cache WHERE key IN ("
+                "SELECT key FROM analysis_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_items,),
+            )
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+
+
+class SharedStoreBackend(CacheBackend):
+    """레플리카 간 공유 저장소(mindscan.shared_state)의 "analysis" 이름공간을 쓰는 저장소."""
+
+    NAMESPACE = "analysis"
+
+    def __init__(self, store: SharedStore):
+        self.store = store
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.store.get_json(self.NAMESPACE, key)
+
+    def set(self, key: str, value: Dict, ttl: float):
+        self.store.set_json(self.NAMESPACE, key, value, ttl)
+
+    def __len__(self) -> int:
+        return self.store.count(self.NAMESPACE)
+
+
+class TieredBackend(CacheBackend):
+    """앞쪽(빠른) 저장소부터 찾고, 뒤쪽에서 찾으면 앞쪽에도 채워 넣습니다."""
+
+    def __init__(self, backends: List[CacheBackend]):
+        self.backends = backends
+
+    def get(self, key: str) -> Optional[Dict]:
+        for i, backend in enumerate(self.backends):
+            value = backend.get(key)
+            if value is not None:
+                remaining = value.get("expires_at", time.time() + 3600) - time.time()
+                for front in self.backends[:i]:
+                    front.set(key, value, max(remaining, 1))
+                return value
+        return None
+
+    def set(self, key: str, value: Dict, ttl: float):
+        for backend in self.backends:
+            backend.set(key, value, ttl)
+
+    def __len__(self) -> int:
+        return len(self.backends[-1])
+
+
+# ==========================================
+# [분석 캐시] 세션 간 공유
+# ==========================================
+class AnalysisCache:
+    """결정적인 분석 결과(Step 2 등)를 세션 사이에 공유해 LLM 호출을 건너뜁니다."""
+
+    def __init__(self, backend: CacheBackend, ttl: float = 7 * 24 * 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "saved_seconds": 0.0, "llm_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls, shared: Optional[SharedStore] = None) -> "AnalysisCache":
+        """메모리 LRU (+ MINDSCAN_ANALYSIS_CACHE_DB 지정 시 SQLite, + 레플리카 공유 저장소). 앱과 일괄 실행 CLI 가 같은 설정을 씁니다."""
+        env = os.environ.get
+        backends: List[CacheBackend] = [MemoryBackend(max_items=int(env("MINDSCAN_ANALYSIS_CACHE_ITEMS", "1024")))]
+        if env("MINDSCAN_ANALYSIS_CACHE_DB"):
+            backends.append(SQLiteBackend(env("MINDSCAN_ANALYSIS_CACHE_DB")))
+        if shared is not None:
+            backends.append(SharedStoreBackend(shared))
+        return cls(TieredBackend(backends), ttl=float(env("MINDSCAN_ANALYSIS_CACHE_TTL_HOURS", "168")) * 3600)
+
+    def get(self, key: str, target_name: str = "") -> Optional[str]:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["saved_seconds"] += value.get("latency", 0.0)
+        return self.restore_name(value["text"], target_name)
+
+    def set(self, key: str, text: str, latency: float):
+        """이름 없는 프롬프트(NAME_TOKEN 사용)의 결과만 넣습니다. 이름이 들어간 텍스트는 완전히 지울 방법이 없어서 받지 않습니다."""
+        with self._lock:
+            self.stats["llm_seconds"] += latency
+        self.backend.set(key, {"text": text, "latency": latency, "expires_at": time.time() + self.ttl}, self.ttl)
+
+    @staticmethod
+    def restore_name(text: str, target_name: str) -> str:
+        return text.replace(NAME_TOKEN, target_name) if target_name else text
+
+    def get_or_compute(self, key: str, compute: Callable[[], str], target_name: str = "") -> str:
+        text = self.get(key, target_name)
+        if text is None:
+            started = time.perf_counter()
+            raw = compute()
+            self.set(key, raw, time.perf_counter() - started)
+            text = self.restore_name(raw, target_name)
+        return text
+
+    def record_stream(self, key: str, chunks: Iterator[str]) -> Iterator[str]:
+        """스트리밍 응답을 그대로(NAME_TOKEN 포함) 흘려보내면서, 끝까지 받으면 캐시에 저장합니다."""
+        started = time.perf_counter()
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        text = "".join(parts)
+        if text.strip():
+            self.set(key, text, time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, float]:
+        total = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "hit_rate": self.stats["hits"] / total if total else 0.0, "entries": len(self.backend)}
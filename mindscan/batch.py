@@ -0,0 +1,222 @@
+"""대상/상황 목록(JSONL)을 Streamlit 없이 한 번에 분석하는 일괄 실행 CLI.
+
+    python -m mindscan.batch targets.jsonl --out results.jsonl --cards-dir cards --concurrency 4
+
+입력 한 줄 예시 (situation/image 는 선택, image 는 입력 파일 기준 상대 경로):
+    {"id": "a1", "target_name": "민지", "gender": "여성", "birth": "1995-03-02", "situation": "읽씹 당했어요"}
+
+앱과 같은 프롬프트(mindscan/prompts.py), 모델 게이트웨이, 분석/카드 캐시 설정(MINDSCAN_* 환경변수)을
+그대로 쓰므로 캐시 미리 채우기, 프롬프트 회귀 확인(--prompts-only), 처리량 측정에 쓸 수 있습니다.
+API 키는 GOOGLE_API_KEY 환경변수, 가짜 모델은 MINDSCAN_MODEL_BACKEND=fake 로 지정합니다.
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from mindscan.ai_manager import AIModelManager, MindScanConfig
+from mindscan.analysis_cache import AnalysisCache, analysis_key
+from mindscan.image_prep import prepare_upload
+from mindscan.model_backends import model_registry
+from mindscan.profile import AnalysisResult, Profile
+from mindscan.prompts import PROFILE_PROMPT_VERSION, parse_prediction, prediction_prompt, profile_prompt
+from mindscan.shared_state import SharedStore
+
+REQUIRED_FIELDS = ("target_name", "gender", "birth")
+
+
+class BatchInputError(ValueError):
+    """입력 JSONL 한 줄을 해석할 수 없을 때 발생합니다."""
+
+
+def read_records(path: str) -> Iterator[Tuple[int, Dict]]:
+    """(줄 번호, 레코드) 를 차례로 돌려줍니다. 빈 줄과 # 주석 줄은 건너뜁니다."""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"): continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise BatchInputError(f"{path}:{line_no}: JSON 형식이 아닙니다 ({e})") from e
+            missing = [name for name in REQUIRED_FIELDS if not record.get(name)]
+            if missing:
+                raise BatchInputError(f"{path}:{line_no}: 필수 항목이 없습니다: {', '.join(missing)}")
+            yield line_no, record
+
+
+def _file_stem(record_id: str) -> str:
+    return re.sub(r"[^\w.-]", "_", record_id) or "record"
+
+
+class BatchRunner:
+    """레코드 하나를 Step 2(성향 분석) → Step 3.5(상황 예측) → 결과 카드 순서로 처리합니다."""
+
+    def __init__(self, ai_manager: Optional[AIModelManager], analysis_cache: AnalysisCache, share_manager=None,
+                 cards_dir: Optional[str] = None, base_dir: str = ".", prompts_only: bool = False):
+        self.ai_manager = ai_manager
+        self.analysis_cache = analysis_cache
+        self.share_manager = share_manager
+        self.cards_dir = cards_dir
+        self.base_dir = base_dir
+        self.prompts_only = prompts_only
+        self._lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.stats = {"records": 0, "failures": 0, "analysis_cache_hits": 0, "cards": 0}
+
+    def _observe(self, stage: str, seconds: float):
+        with self._lock: self.timings[stage].append(seconds)
+
+    def _incr(self, name: str):
+        with self._lock: self.stats[name] += 1
+
+    def _analysis(self, record: Dict, birth: datetime.date, out: Dict) -> str:
+        prompt = profile_prompt(record["gender"], birth)
+        if self.prompts_only:
+            out["profile_prompt"] = prompt
+            return ""
+        # 앱의 Step 2 와 같은 키: 같은 성별/생년월일/모델 조합은 캐시된 결과를 재사용
+        key = analysis_key(self.ai_manager.config.MODEL_PREFERENCES[0], PROFILE_PROMPT_VERSION,
+                           gender=record["gender"], birth=birth)
+        started = time.perf_counter()
+        text = self.analysis_cache.get(key, record["target_name"])
+        out["analysis_cached"] = text is not None
+        if text is None:
+            text = self.ai_manager.generate_response(prompt, step="2")
+            if text.strip():
+                self.analysis_cache.set(key, text, time.perf_counter() - started)
+            text = AnalysisCache.restore_name(text, record["target_name"])
+        else:
+            self._incr("analysis_cache_hits")
+        self._observe("2 analysis", time.perf_counter() - started)
+        out["analysis"] = text
+        return text
+
+    def _prediction(self, record: Dict, profile: Profile, out: Dict):
+        prompt = prediction_prompt(profile.to_prompt() if not self.prompts_only else "{profile}", record["situation"])
+        if self.prompts_only:
+            out["prediction_prompt"] = prompt
+            return
+        image = None
+        if record.get("image"):
+            with open(os.path.join(self.base_dir, record["image"]), "rb") as f:
+                image = prepare_upload(f.read())
+        started = time.perf_counter()
+        text = self.ai_manager.generate_response(prompt, image, step="3.5")
+        self._observe("3.5 prediction", time.perf_counter() - started)
+        out["prediction"] = text
+        out["prediction_parsed"] = parse_prediction(text)
+
+    def _card(self, record: Dict, record_id: str, profile: Profile, out: Dict):
+        from mindscan.share_card import RESULT_CARD_TITLE
+        started = time.perf_counter()
+        images = self.share_manager.create_result_image(RESULT_CARD_TITLE, record["target_name"], profile)
+        self._observe("card", time.perf_counter() - started)
+        cards = {}
+        for image in images.values():
+            path = os.path.join(self.cards_dir, f"{_file_stem(record_id)}.{image.name}.{image.extension}")
+            with open(path, "wb") as f: f.write(image.data)
+            cards[image.name] = {"path": path, "bytes": image.size, "width": image.width, "height": image.height}
+        out["cards"] = cards
+        self._incr("cards")
+
+    def run_one(self, line_no: int, record: Dict) -> Dict:
+        record_id = str(record.get("id") or line_no)
+        out: Dict = {"id": record_id, "target_name": record["target_name"]}
+        started = time.perf_counter()
+        try:
+            birth = datetime.date.fromisoformat(str(record["birth"]))
+            analysis = self._analysis(record, birth, out)
+            # 이후 단계(예측 프롬프트, 카드)는 한 번 파싱한 프로필을 씀
+            profile = AnalysisResult.parse_profile(analysis)
+            if analysis: out["profile"] = profile.to_dict()
+            if record.get("situation"): self._prediction(record, profile, out)
+            if self.share_manager is not None and analysis: self._card(record, record_id, profile, out)
+        except Exception as e:
+            self._incr("failures")
+            out["error"] = f"{type(e).__name__}: {e}"
+        out["seconds"] = round(time.perf_counter() - started, 3)
+        self._observe("record", out["seconds"])
+        self._incr("records")
+        return out
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0.0
+
+
+def print_summary(runner: BatchRunner, wall: float, ai_manager: Optional[AIModelManager], stream=sys.stderr):
+    ok = runner.stats["records"] - runner.stats["failures"]
+    print(f"records={runner.stats['records']} failures={runner.stats['failures']} "
+          f"analysis_cache_hits={runner.stats['analysis_cache_hits']} cards={runner.stats['cards']} "
+          f"wall={wall:.2f}s throughput={ok / wall if wall else 0.0:.2f} records/s", file=stream)
+    print(f"{'stage':<16}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}", file=stream)
+    for stage, values in runner.timings.items():
+        print(f"{stage:<16}{len(values):>6}{_percentile(values, 0.5) * 1000:>10.1f}"
+              f"{_percentile(values, 0.95) * 1000:>10.1f}{statistics.mean(values) * 1000:>10.1f}", file=stream)
+    if ai_manager is not None:
+        print(f"gateway: {ai_manager.gateway.snapshot()}", file=stream)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="대상/상황 JSONL 파일")
+    parser.add_argument("--out", default="-", help="결과 JSONL 경로 (기본: 표준 출력)")
+    parser.add_argument("--cards-dir", help="지정하면 결과 카드 이미지를 변형별로 저장")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 처리할 레코드 수")
+    parser.add_argument("--limit", type=int, help="앞에서부터 이 개수만 처리")
+    parser.add_argument("--prompts-only", action="store_true", help="모델을 호출하지 않고 만들어진 프롬프트만 출력")
+    args = parser.parse_args(argv)
+
+    try:
+        records = list(read_records(args.input))
+    except (OSError, BatchInputError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.limit is not None: records = records[:args.limit]
+
+    # MINDSCAN_SHARED_STORE 가 있으면 앱 레플리카들과 같은 분석/카드 캐시를 채움
+    shared = SharedStore.from_env()
+    ai_manager = None
+    if not args.prompts_only:
+        config = MindScanConfig()
+        model_registry.configure(os.environ.get("GOOGLE_API_KEY"))
+        if not model_registry.ready:
+            print("GOOGLE_API_KEY 가 없습니다 (가짜 모델은 MINDSCAN_MODEL_BACKEND=fake).", file=sys.stderr)
+            return 2
+        ai_manager = AIModelManager(config)
+    share_manager = None
+    if args.cards_dir and not args.prompts_only:
+        # 카드 렌더링(PIL)은 필요할 때만 import
+        from mindscan.card_cache import CardCache
+        from mindscan.share_card import ShareManager
+        os.makedirs(args.cards_dir, exist_ok=True)
+        share_manager = ShareManager(cache=CardCache.from_env(shared=shared))
+
+    runner = BatchRunner(ai_manager, AnalysisCache.from_env(shared=shared), share_manager, cards_dir=args.cards_dir,
+                         base_dir=os.path.dirname(os.path.abspath(args.input)), prompts_only=args.prompts_only)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(args.concurrency, 1), thread_name_prefix="batch") as pool:
+            # 결과는 입력 순서대로 씁니다 (처리는 동시에)
+            for result in pool.map(lambda item: runner.run_one(*item), records):
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout: out.close()
+    print_summary(runner, time.perf_counter() - started, ai_manager)
+    return 1 if runner.stats["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from mindscan.metrics import log_exception
+from mindscan.shared_state import SharedStore
+
+
+def card_key(title: str, target_name: str, text_content: str, template_version: str) -> str:
+    """카드 입력 내용으로 콘텐츠 주소(sha256)를 만듭니다."""
+    h = hashlib.sha256()
+    for part in (template_version, title, target_name, text_content):
+        data = (part or "").encode("utf-8")
+        # 길이를 함께 넣어 필드 경계가 섞이지 않게 합니다.
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class CardCache:
+    """공유 카드 이미지(PNG/WebP/JPEG) 바이트 캐시 (메모리 LRU + 선택적 디스크 저장소 + 선택적 레플리카 공유 저장소)."""
+
+    SHARED_NAMESPACE = "cards"
+
+    def __init__(self, max_items: int = 64, disk_dir: Optional[str] = None, disk_max_bytes: int = 200 * 1024 * 1024,
+                 shared: Optional[SharedStore] = None, shared_ttl: float = 7 * 24 * 3600):
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, shared: Optional[SharedStore] = None) -> "CardCache":
+        # MINDSCAN_CARD_CACHE_DIR 를 지정하면 렌더링된 카드를 디스크에도 보관합니다.
+        # shared(레플리카 공유 저장소)를 주면 다른 레플리카가 렌더링한 카드도 다시 그리지 않고 가져옵니다.
+        env = os.environ.get
+        return cls(max_items=int(env("MINDSCAN_CARD_CACHE_ITEMS", "64")), disk_dir=env("MINDSCAN_CARD_CACHE_DIR") or None,
+                   disk_max_bytes=int(env("MINDSCAN_CARD_CACHE_MB", "200")) * 1024 * 1024, shared=shared)
+
+    # ---------------- 메모리 계층 ----------------
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    # ---------------- 디스크 계층 ----------------
+    def _disk_path(self, key: str) -> str:
+        # 형식은 키(변형 설정)에 들어 있으므로 확장자는 형식과 상관없이 하나로 씀
+        return os.path.join(self.disk_dir, f"{key}.img")
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir: return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f: data = f.read()
+            os.utime(path)  # 최근 사용 시각 갱신 (축출 순서에 사용)
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key: str, data: bytes):
+        if not self.disk_dir: return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f: f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            log_exception("card_cache_write_failed", key=key[:12])
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        try:
+            entries = []
+            for name in os.listdir(self.disk_dir):
+                if not name.endswith((".img", ".png")): continue  # .png: 이전 버전이 남긴 파일
+                st_ = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((st_.st_mtime, st_.st_size, name))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.disk_max_bytes: break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+                total -= size
+                self._incr("disk_evictions")
+            except OSError:
+                pass
+
+    def _incr(self, name: str):
+        # 스크립트 스레드와 렌더 풀 완료 콜백이 함께 세므로 락 안에서 증가
+        with self._lock: self.stats[name] += 1
+
+    # ---------------- 공개 API ----------------
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return data
+        data = self._disk_get(key)
+        if data is not None:
+            self._incr("disk_hits")
+            self._remember(key, data)
+            return data
+        data = self.shared.get(self.SHARED_NAMESPACE, key) if self.shared is not None else None
+        if data is not None:
+            self._incr("shared_hits")
+            self._remember(key, data)
+            self._disk_put(key, data)
+            return data
+        self._incr("misses")
+        return None
+
+    def put(self, key: str, data: bytes):
+        with self._lock:
+            if key in self._memory:  # 같은 작업을 여러 번 기다린 경우 중복 저장하지 않음
+                self._memory.move_to_end(key)
+                return
+        self._remember(key, data)
+        self._disk_put(key, data)
+        if self.shared is not None: self.shared.set(self.SHARED_NAMESPACE, key, data, self.shared_ttl)
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        """캐시에 있으면 저장된 바이트를, 없으면 render()를 실행해 저장 후 돌려줍니다."""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def snapshot(self) -> Dict[str, float]:
+        """적중률 등 캐시 크기 조정을 위한 카운터를 돌려줍니다."""
+        with self._lock:
+            stats = dict(self.stats)
+            memory_items = len(self._memory)
+            memory_bytes = sum(len(v) for v in self._memory.values())
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["shared_hits"]
+        total = hits + stats["misses"]
+        return {**stats, "hits": hits, "hit_rate": hits / total if total else 0.0,
+                "memory_items": memory_items, "memory_bytes": memory_bytes}
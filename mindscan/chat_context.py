@@ -0,0 +1,125 @@
+import json
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from mindscan.chat_messages import ChatMessage
+
+# 페르소나(시스템) 프롬프트에 대한 모델의 짧은 확인 응답. 매 턴 동일해야 접두사 캐시가 유지됩니다.
+PERSONA_ACK = '{"reply": "알겠어.", "emotion": "🙂"}'
+SUMMARY_HEADER = "[이전 대화 요약]"
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 추정 (한글/한자는 글자당 약 0.7토큰, 그 외는 4글자당 1토큰)."""
+    cjk = sum(1 for ch in text if ord(ch) >= 0x1100)
+    return int(cjk * 0.7 + (len(text) - cjk) / 4) + 1
+
+
+def _assistant_turn(message: ChatMessage) -> str:
+    """이전 답변은 reply/emotion 만 남긴 짧은 JSON으로 되돌려 보냅니다 (속마음/팁은 제외)."""
+    return json.dumps({"reply": message.reply, "emotion": message.emotion}, ensure_ascii=False)
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class ChatPrompt(NamedTuple):
+    history: List[Dict]   # Gemini start_chat(history=...) 형식
+    message: str          # 이번 턴에 보낼 유저 메시지
+    estimated_tokens: int
+    summarized_turns: int
+
+
+class ChatContext:
+    """Step 4 채팅 프롬프트를 (고정 페르소나 + 요약 + 최근 대화 창) 으로 구성합니다.
+
+    페르소나는 항상 같은 첫 턴으로 두어 Gemini의 암시적 접두사 캐시를 타게 하고,
+    최근 대화는 token_budget 안에서만 원문으로, 그보다 오래된 대화는 짧게 요약합니다.
+    덕분에 대화가 길어져도 턴당 입력 토큰이 일정하게 유지됩니다.
+    """
+
+    def __init__(self, persona_prompt: str, token_budget: int = 1200, summary_budget: int = 250):
+        self.persona_prompt = persona_prompt
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+
+    def _summarize(self, messages: List[ChatMessage]) -> str:
+        """오래된 턴은 LLM 호출 없이 발화만 짧게 잘라 이어 붙입니다 (최근 것 우선으로 예산 내 유지)."""
+        lines: List[str] = []
+        used = 0
+        for m in reversed(messages):
+            who = "나" if m.role == "user" else "상대"
+            line = f"- {who}: {_clip(m.reply, 60)}"
+            cost = estimate_tokens(line)
+            if used + cost > self.summary_budget: break
+            lines.append(line)
+            used += cost
+        return "\n".join([SUMMARY_HEADER] + list(reversed(lines)))
+
+    def build(self, messages: List[ChatMessage]) -> ChatPrompt:
+        """messages 의 마지막 항목(유저 메시지)을 보낼 프롬프트를 만듭니다."""
+        *previous, last = messages
+        history = [
+            {"role": "user", "parts": [self.persona_prompt]},
+            {"role": "model", "parts": [PERSONA_ACK]},
+        ]
+
+        # 최근 턴부터 예산 안에 들어가는 만큼 원문으로 유지
+        window: List[Dict] = []
+        used = estimate_tokens(last.content)
+        cut = len(previous)
+        for i in range(len(previous) - 1, -1, -1):
+            m = previous[i]
+            text = m.content if m.role == "user" else _assistant_turn(m)
+            cost = estimate_tokens(text)
+            if used + cost > self.token_budget: break
+            window.append({"role": "user" if m.role == "user" else "model", "parts": [text]})
+            used += cost
+            cut = i
+        window.reverse()
+        # Gemini 대화 기록은 user 턴으로 시작해야 하므로 창 맨 앞의 model 턴은 요약 쪽으로 넘깁니다.
+        while window and window[0]["role"] == "model":
+            window.pop(0)
+            cut += 1
+
+        older = previous[:cut]
+        if older:
+            history += [
+                {"role": "user", "parts": [self._summarize(older)]},
+                {"role": "model", "parts": [PERSONA_ACK]},
+            ]
+        history += window
+
+        total = sum(estimate_tokens(p) for h in history for p in h["parts"]) + estimate_tokens(last.content)
+        return ChatPrompt(history, last.content, total, len(older))
+
+
+class _ContextStats:
+    """턴당 입력 토큰 (Gemini usage_metadata 가 있으면 실제 값, 없으면 추정값)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.input_tokens = 0
+        self.last_input_tokens = 0
+
+    def record(self, input_tokens: int):
+        with self._lock:
+            self.turns += 1
+            self.input_tokens += input_tokens
+            self.last_input_tokens = input_tokens
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {"turns": self.turns, "input_tokens": self.input_tokens, "last_input_tokens": self.last_input_tokens,
+                    "avg_input_tokens": self.input_tokens / self.turns if self.turns else 0.0}
+
+
+context_stats = _ContextStats()
+
+
+def usage_prompt_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "prompt_token_count", None) if usage else None
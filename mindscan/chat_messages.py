@@ -0,0 +1,87 @@
+import html
+import json
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from mindscan.response_decoder import decode_chat_reply
+
+# 답변 JSON이 깨졌을 때 보여줄 기본값 (기존 렌더링 루프의 except 분기와 동일)
+FALLBACK_EMOTION = "🤖"
+FALLBACK_THOUGHTS = "데이터 없음"
+
+
+@dataclass(slots=True)
+class ChatMessage:
+    """Step 4 채팅 메시지 한 건. 도착할 때 한 번만 파싱/검증하고 HTML 조각도 미리 만들어 둡니다."""
+    role: str            # "user" 또는 "assistant"
+    content: str         # 원문 (유저 입력 또는 모델이 보낸 JSON 텍스트)
+    reply: str = ""
+    emotion: str = ""
+    thoughts: str = ""
+    tips: str = ""
+    warning: str = ""
+    parsed: bool = True  # assistant 답변이 JSON으로 정상 해석되었는지
+    html: str = ""       # 말풍선 HTML
+    profile_html: str = ""
+    detail_md: str = ""  # 속마음/공략팁 expander 내용
+
+    @classmethod
+    def from_user(cls, text: str) -> "ChatMessage":
+        return cls("user", text, reply=text, html=user_bubble_html(text))
+
+    @classmethod
+    def from_assistant(cls, raw: str) -> "ChatMessage":
+        return cls.from_reply(raw, decode_chat_reply(raw))
+
+    @classmethod
+    def from_reply(cls, raw: str, data: Optional[Dict[str, str]]) -> "ChatMessage":
+        """이미 decode_chat_reply 로 해석한 답변(실패했으면 None)으로 만듭니다 (다시 해석하지 않음)."""
+        if data is not None:
+            # 코드펜스/깨진 JSON을 고친 결과를 정규화해서 보관
+            message = cls(
+                "assistant", json.dumps(data, ensure_ascii=False),
+                reply=data["reply"] or "...", emotion=data["emotion"] or "😐",
+                thoughts=data["thoughts"], tips=data["tips"], warning=data["warning"],
+            )
+        else:
+            message = cls("assistant", raw, reply=raw, emotion=FALLBACK_EMOTION, thoughts=FALLBACK_THOUGHTS, parsed=False)
+        message.html = bot_bubble_html(message.reply)
+        message.profile_html = f'<div class="chat-profile">{html.escape(message.emotion)}</div>'
+        message.detail_md = (
+            f"**🧠 속마음:** {message.thoughts}  \n"
+            f"**💡 공략팁:** {message.tips}  \n"
+            f"**⚠️ 주의:** {message.warning}"
+        )
+        return message
+
+    def to_dict(self) -> dict:
+        """세션 스냅샷용 (원문만 저장하고 HTML 은 불러올 때 다시 만듦)."""
+        return {"role": self.role, "content": self.content, "parsed": self.parsed}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChatMessage":
+        if data["role"] == "user": return cls.from_user(data["content"])
+        # 해석된 답변의 content 는 이미 정규화한 JSON 이므로 decode_chat_reply 를 다시 거치지 않음 (decoder_stats 중복 집계 방지)
+        return cls.from_reply(data["content"], json.loads(data["content"]) if data.get("parsed") else None)
+
+
+def user_bubble_html(text: str) -> str:
+    # 유저 (오른쪽, 보라색)
+    return f"""
+    <div class="chat-row chat-row-user">
+        <div class="chat-bubble user-bubble">
+            {html.escape(text)}
+        </div>
+    </div>
+    """
+
+
+def bot_bubble_html(reply_text: str) -> str:
+    # AI (왼쪽, 흰색)
+    return f"""
+    <div class="chat-row chat-row-bot">
+        <div class="chat-bubble bot-bubble">
+            {html.escape(reply_text)}
+        </div>
+    </div>
+    """
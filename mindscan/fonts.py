@@ -0,0 +1,126 @@
+import glob
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from PIL import ImageFont
+
+
+# ==========================================
+# [설정] 한글 폰트 후보
+# ==========================================
+# 환경변수로 지정한 경로가 가장 먼저 사용됩니다.
+FONT_ENV_VARS = {"bold": "MINDSCAN_FONT_BOLD", "regular": "MINDSCAN_FONT_REGULAR"}
+
+# 기존 설정값(윈도우 맑은 고딕) + 리눅스 배포판/Streamlit Cloud(packages.txt: fonts-nanum) 경로
+FONT_CANDIDATES = {
+    "bold": [
+        "malgunbd.ttf",
+        "C:/Windows/Fonts/malgunbd.ttf",
+        "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf",
+        "/usr/share/fonts/truetype/nanum/NanumBarunGothicBold.ttf",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+        "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc",
+        "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Bold.ttc",
+        "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+    ],
+    "regular": [
+        "malgun.ttf",
+        "C:/Windows/Fonts/malgun.ttf",
+        "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+        "/usr/share/fonts/truetype/nanum/NanumBarunGothic.ttf",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+        "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+    ],
+}
+
+# 고정 경로에 없을 때 한 번만 훑어볼 폰트 디렉터리와 파일명 패턴
+FONT_SEARCH_DIRS = ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"), os.path.expanduser("~/.local/share/fonts")]
+FONT_SEARCH_PATTERNS = {
+    "bold": ["NanumGothicBold.ttf", "NanumBarunGothicBold.ttf", "NotoSansKR-Bold.*", "NotoSansCJK*-Bold.ttc"],
+    "regular": ["NanumGothic.ttf", "NanumBarunGothic.ttf", "NotoSansKR-Regular.*", "NotoSansCJK*-Regular.ttc"],
+}
+
+
+def _font_index(path: str) -> int:
+    """Noto CJK 컬렉션(.ttc)은 한국어(KR) 서체가 두 번째(index 1)에 들어 있습니다."""
+    return 1 if "NotoSansCJK" in os.path.basename(path) else 0
+
+
+class FontRegistry:
+    """프로세스당 한 번만 폰트를 찾고, (경로, 크기)별 FreeTypeFont를 재사용합니다."""
+
+    def __init__(self, candidates: Optional[Dict[str, List[str]]] = None):
+        self.candidates = candidates or FONT_CANDIDATES
+        self._paths: Optional[Dict[str, Optional[str]]] = None
+        self._fonts: Dict[Tuple[Optional[str], int], ImageFont.ImageFont] = {}
+        self._lock = threading.Lock()
+
+    def _probe(self, path: str) -> bool:
+        try:
+            ImageFont.truetype(path, 10, index=_font_index(path))
+            return True
+        except OSError:
+            return False
+
+    def _discover(self, weight: str) -> Optional[str]:
+        env_path = os.environ.get(FONT_ENV_VARS[weight])
+        for path in ([env_path] if env_path else []) + self.candidates.get(weight, []):
+            if self._probe(path): return path
+        for directory in FONT_SEARCH_DIRS:
+            if not os.path.isdir(directory): continue
+            for pattern in FONT_SEARCH_PATTERNS[weight]:
+                for path in sorted(glob.glob(os.path.join(directory, "**", pattern), recursive=True)):
+                    if self._probe(path): return path
+        return None
+
+    @property
+    def paths(self) -> Dict[str, Optional[str]]:
+        """선택된 폰트 경로 (weight -> path, 못 찾으면 None)."""
+        if self._paths is None:
+            with self._lock:
+                if self._paths is None:
+                    paths = {weight: self._discover(weight) for weight in FONT_ENV_VARS}
+                    # 볼드/일반 중 하나만 있으면 서로 대체해서 한글이 깨지지 않게 합니다.
+                    paths["bold"] = paths["bold"] or paths["regular"]
+                    paths["regular"] = paths["regular"] or paths["bold"]
+                    self._paths = paths
+                    if not paths["regular"]:
+                        print("한글 폰트를 찾지 못했습니다. 기본 폰트로 대체합니다. (한글 깨질 수 있음)")
+        return self._paths
+
+    def get(self, weight: str, size: int) -> ImageFont.ImageFont:
+        """weight('bold'/'regular')와 크기에 맞는 폰트 객체를 돌려줍니다."""
+        path = self.paths.get(weight)
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is None:
+            if path:
+                font = ImageFont.truetype(path, size, index=_font_index(path))
+            else:
+                try:
+                    font = ImageFont.load_default(size=size)
+                except TypeError:  # Pillow < 10.1
+                    font = ImageFont.load_default()
+            with self._lock:
+                font = self._fonts.setdefault(key, font)
+        return font
+
+    def describe(self) -> Dict[str, str]:
+        """어떤 폰트가 선택되었는지 표시용으로 돌려줍니다."""
+        return {weight: path or "PIL default" for weight, path in self.paths.items()}
+
+    def warmup(self, sizes=(70, 45, 32, 24)):
+        """카드에 쓰는 크기를 미리 로드해 첫 요청의 TTF 파싱 비용을 없앱니다."""
+        for weight in ("bold", "regular"):
+            for size in sizes:
+                self.get(weight, size)
+
+
+font_registry = FontRegistry()
+
+
+def get_font(weight: str, size: int) -> ImageFont.ImageFont:
+    return font_registry.get(weight, size)
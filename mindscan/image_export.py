@@ -0,0 +1,110 @@
+import io
+import os
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+# 형식별 (MIME 타입, 파일 확장자)
+FORMATS = {"WEBP": ("image/webp", "webp"), "JPEG": ("image/jpeg", "jpg"), "PNG": ("image/png", "png")}
+
+
+class ExportSpec(NamedTuple):
+    """내보낼 이미지 하나의 설정. 같은 레이아웃 결과에서 크기/형식만 바꿔 여러 개를 만듭니다."""
+    name: str                        # "full"(저장용), "thumb"(미리보기) 등
+    fmt: str = "PNG"                 # WEBP / JPEG / PNG
+    width: Optional[int] = None      # 가로 픽셀 (None 이면 원본 크기, 세로는 비율 유지)
+    quality: int = 85                # WEBP/JPEG 시작 품질
+    colors: int = 256                # PNG 팔레트 색 수 (0 이면 양자화하지 않고 RGB 그대로)
+    max_bytes: Optional[int] = None  # 목표 크기. 넘으면 품질/색 수를 낮춰 다시 인코딩
+    min_quality: int = 50            # 목표 크기를 맞출 때 내려갈 수 있는 최저 품질
+
+    @property
+    def tag(self) -> str:
+        """캐시 키에 넣는 설정 요약 (설정이 바뀌면 캐시도 새로 만들어짐)."""
+        return f"{self.name}:{self.fmt}:{self.width}:{self.quality}:{self.colors}:{self.max_bytes}:{self.min_quality}"
+
+
+class ExportedImage(NamedTuple):
+    name: str
+    data: bytes
+    mime_type: str
+    extension: str
+    width: int
+    height: int
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @classmethod
+    def from_bytes(cls, spec: ExportSpec, data: bytes) -> "ExportedImage":
+        """캐시에 저장해 둔 바이트로 다시 만듭니다 (크기는 헤더만 읽어서 확인)."""
+        width, height = Image.open(io.BytesIO(data)).size
+        mime_type, extension = FORMATS[spec.fmt]
+        return cls(spec.name, data, mime_type, extension, width, height)
+
+
+def _save(img: Image.Image, fmt: str, quality: int, colors: int) -> bytes:
+    buffered = io.BytesIO()
+    if fmt == "PNG":
+        if colors:
+            # 그라데이션 + 글자 카드는 팔레트(디더링) PNG 로도 거의 구분되지 않고 크기는 크게 줄어듭니다.
+            img = img.quantize(colors, method=Image.Quantize.FASTOCTREE)
+        img.save(buffered, format="PNG", optimize=True)
+    elif fmt == "JPEG":
+        # 글자 가장자리가 번지지 않게 색 정보 서브샘플링은 끔(4:4:4)
+        img.save(buffered, format="JPEG", quality=quality, optimize=True, progressive=True, subsampling=0)
+    else:
+        img.save(buffered, format="WEBP", quality=quality, method=4)
+    return buffered.getvalue()
+
+
+def encode(img: Image.Image, spec: ExportSpec) -> ExportedImage:
+    """spec 에 맞춰 크기를 줄이고 인코딩합니다. max_bytes 가 있으면 그 안에 들어가도록 품질/색 수를 낮춥니다."""
+    if spec.fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 이미지 형식입니다: {spec.fmt}")
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if spec.width and spec.width < img.width:
+        img = img.resize((spec.width, round(img.height * spec.width / img.width)), Image.LANCZOS)
+
+    data = _save(img, spec.fmt, spec.quality, spec.colors)
+    if spec.max_bytes and len(data) > spec.max_bytes:
+        if spec.fmt == "PNG":
+            # 팔레트 색 수를 절반씩 줄여 봄 (16색 아래로는 글자가 깨져 보임)
+            colors = spec.colors or 256
+            while len(data) > spec.max_bytes and colors > 16:
+                colors //= 2
+                data = _save(img, "PNG", spec.quality, colors)
+        else:
+            # 목표 크기 안에 들어가는 가장 높은 품질을 이분 탐색 (없으면 최저 품질 결과)
+            lo, hi, best = spec.min_quality, spec.quality - 1, None
+            while lo <= hi:
+                quality = (lo + hi) // 2
+                candidate = _save(img, spec.fmt, quality, spec.colors)
+                if len(candidate) <= spec.max_bytes:
+                    best, lo = candidate, quality + 1
+                else:
+                    hi = quality - 1
+            data = best if best is not None else _save(img, spec.fmt, spec.min_quality, spec.colors)
+
+    mime_type, extension = FORMATS[spec.fmt]
+    return ExportedImage(spec.name, data, mime_type, extension, img.width, img.height)
+
+
+def export_variants(img: Image.Image, specs: Iterable[ExportSpec]) -> Dict[str, ExportedImage]:
+    """한 번 그린 이미지에서 여러 변형(저장용/미리보기 등)을 만들어 이름별로 돌려줍니다."""
+    return {spec.name: encode(img, spec) for spec in specs}
+
+
+def card_variants_from_env() -> Tuple[ExportSpec, ...]:
+    """공유 카드 변형 설정 (MINDSCAN_CARD_* 환경변수)."""
+    env = os.environ.get
+    max_kb = int(env("MINDSCAN_CARD_MAX_KB", "0"))
+    return (
+        ExportSpec("full", fmt=env("MINDSCAN_CARD_FORMAT", "PNG").upper(),
+                   quality=int(env("MINDSCAN_CARD_QUALITY", "85")), colors=int(env("MINDSCAN_CARD_COLORS", "256")),
+                   max_bytes=max_kb * 1024 or None),
+        ExportSpec("thumb", fmt=env("MINDSCAN_CARD_THUMB_FORMAT", "WEBP").upper(),
+                   width=int(env("MINDSCAN_CARD_THUMB_WIDTH", "360")), quality=int(env("MINDSCAN_CARD_THUMB_QUALITY", "75"))),
+    )
@@ -0,0 +1,78 @@
+import io
+import os
+import threading
+from typing import Dict, NamedTuple
+
+# 업로드 이미지 전처리 설정 (Gemini는 긴 변 기준 1~2천 픽셀이면 채팅 캡처 글자를 충분히 읽습니다)
+MAX_EDGE = int(os.environ.get("MINDSCAN_UPLOAD_MAX_EDGE", "1536"))
+OUTPUT_FORMAT = os.environ.get("MINDSCAN_UPLOAD_FORMAT", "WEBP").upper()  # WEBP 또는 JPEG
+OUTPUT_QUALITY = int(os.environ.get("MINDSCAN_UPLOAD_QUALITY", "82"))
+
+_MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+
+class PreparedImage(NamedTuple):
+    """세션에 보관하는 압축된 업로드 이미지 (디코딩된 PIL 객체 대신 바이트만 유지)."""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_bytes: int
+
+    def to_part(self) -> Dict:
+        """google.generativeai 에 그대로 넘길 수 있는 inline 이미지 파트."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+class _UploadStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, bytes_in: int, bytes_out: int):
+        with self._lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            saved = self.bytes_in - self.bytes_out
+            return {
+                "requests": self.requests, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out,
+                "bytes_saved": saved, "bytes_saved_per_request": saved / self.requests if self.requests else 0.0,
+            }
+
+
+upload_stats = _UploadStats()
+
+
+def prepare_upload(data: bytes, max_edge: int = MAX_EDGE, fmt: str = OUTPUT_FORMAT, quality: int = OUTPUT_QUALITY) -> PreparedImage:
+    """업로드 이미지를 작게 줄이고 EXIF를 제거한 압축 바이트로 바꿉니다."""
+    from PIL import Image, ImageOps  # 업로드가 있을 때만 import (랜딩 페이지 cold start 에서 제외)
+    img = Image.open(io.BytesIO(data))
+    # JPEG는 디코딩 단계에서 바로 축소(draft)해 전체 해상도를 메모리에 풀지 않습니다.
+    img.draft("RGB", (max_edge, max_edge))
+    img = ImageOps.exif_transpose(img)  # 회전 정보는 반영하고, 저장할 때 EXIF는 버림
+    img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    if img.mode in ("RGBA", "LA", "P"):
+        # 투명 배경(PNG 캡처)은 흰 배경으로 합칩니다.
+        rgba = img.convert("RGBA")
+        img = Image.new("RGB", rgba.size, "white")
+        img.paste(rgba, mask=rgba.getchannel("A"))
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    buffered = io.BytesIO()
+    img.save(buffered, format=fmt, quality=quality, optimize=True)
+    out = buffered.getvalue()
+    upload_stats.record(len(data), len(out))
+    return PreparedImage(out, _MIME_TYPES[fmt], img.width, img.height, len(data))
+
+
+def as_content_part(image):
+    """PreparedImage 는 inline 파트로, 그 밖의 값(PIL 이미지 등)은 그대로 돌려줍니다."""
+    return image.to_part() if isinstance(image, PreparedImage) else image
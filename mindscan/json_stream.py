@@ -0,0 +1,39 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import Dict
+
+# "key": "  형태로 문자열 값이 시작되는 위치를 찾습니다.
+_STRING_FIELD = re.compile(r'"([A-Za-z_][A-Za-z0-9_]*)"\s*:\s*"')
+
+
+class JSONFieldStream:
+    """스트리밍으로 들어오는 JSON 텍스트에서 문자열 필드를 완성되는 즉시 꺼냅니다.
+
+    채팅 답변은 {"reply": ..., "emotion": ..., "thoughts": ...} 형태이므로, 전체 JSON이
+    끝나기 전에 reply 값이 닫히는 순간 화면에 보여줄 수 있습니다.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, str] = {}
+        self._pos = 0  # 아직 해석하지 않은 위치
+
+    def feed(self, chunk: str) -> Dict[str, str]:
+        """청크를 추가하고 이번에 새로 완성된 필드만 돌려줍니다."""
+        self.buffer += chunk
+        completed: Dict[str, str] = {}
+        while True:
+            match = _STRING_FIELD.search(self.buffer, self._pos)
+            if not match: break
+            try:
+                value, end = scanstring(self.buffer, match.end())
+            except (json.JSONDecodeError, ValueError):
+                break  # 문자열이 아직 닫히지 않음 -> 다음 청크를 기다림
+            key = match.group(1)
+            if key not in self.fields:
+                self.fields[key] = value
+                completed[key] = value
+            self._pos = end
+        return completed
+
@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from mindscan.metrics import log
+
+# 재시도해도 되는 오류 (요청 한도 초과 / 일시적인 서버 오류 / 시간 초과)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                         "DeadlineExceeded", "GatewayTimeout", "BadGateway"}
+
+
+class LLMUnavailable(RuntimeError):
+    """LLM 게이트웨이가 요청을 처리하지 못했을 때 (대기열 초과, 시간 초과, 재시도 소진)."""
+
+
+class LLMBusy(LLMUnavailable):
+    """동시 호출/요청 속도 한도 때문에 제한 시간 안에 차례가 오지 않았습니다."""
+
+
+class LLMTimeout(LLMUnavailable):
+    """응답이 제한 시간 안에 끝나지 않았습니다."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    if getattr(error, "retryable", False): return True
+    code = getattr(error, "code", None)
+    code = getattr(code, "value", code)  # grpc StatusCode 등
+    if isinstance(code, int) and code in RETRYABLE_STATUS: return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES or isinstance(error, (TimeoutError, ConnectionError))
+
+
+def request_key(*parts) -> str:
+    """프롬프트 구성요소(문자열/이미지 바이트/dict)로 합치기(coalescing)용 키를 만듭니다."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray)):
+            data = bytes(part)
+        else:
+            data = json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def _chunk_text(chunk) -> str:
+    try:
+        return chunk.text or ""
+    except ValueError:  # 안전 필터 등으로 텍스트가 없는 조각
+        return ""
+
+
+class TokenBucket:
+    """초당 rate 개씩 채워지고 최대 burst 개까지 쌓이는 토큰 버킷. rate <= 0 이면 제한 없음."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        if self.rate <= 0: return True
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline: return False
+            time.sleep(wait)
+
+
+class _Flight:
+    """진행 중(또는 막 끝난) LLM 호출 하나. 같은 키의 요청은 모두 이 조각들을 함께 읽습니다."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[str] = []
+        self.response = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.finished_at = 0.0
+        self.cond = threading.Condition()
+        self.callbacks: List[Callable[[], None]] = []
+
+    def add_done_callback(self, fn: Callable[[], None]):
+        """호출이 끝나면(성공/실패 모두) fn() 을 게이트웨이 스레드에서 실행합니다. 이미 끝났으면 바로 실행."""
+        with self.cond:
+            if not self.done:
+                self.callbacks.append(fn)
+                return
+        fn()
+
+    def _finish(self):
+        with self.cond:
+            self.done = True
+            self.finished_at = time.monotonic()
+            self.cond.notify_all()
+            callbacks, self.callbacks = self.callbacks, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:  # 콜백 오류가 게이트웨이 스레드를 멈추지 않게
+                log.exception("gateway callback failed", extra={"fields": {"key": self.key[:12]}})
+
+    def read(self, deadline: float) -> Iterator[str]:
+        index = 0
+        while True:
+            with self.cond:
+                while index >= len(self.chunks) and not self.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0: raise LLMTimeout("AI 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.")
+                    self.cond.wait(remaining)
+                if index >= len(self.chunks):
+                    if self.error is not None: raise self.error
+                    return
+                new = self.chunks[index:]
+                index = len(self.chunks)
+            yield from new
+
+
+class LLMGateway:
+    """모든 세션의 LLM 호출이 거쳐 가는 공유 게이트웨이.
+
+    - 동시 호출 수(세마포어)와 초당 요청 수(토큰 버킷)를 프로세스 전체에서 제한합니다.
+    - 재시도 가능한 오류는 첫 조각을 받기 전까지 지터를 준 지수 백오프로 다시 시도합니다.
+    - 같은 키로 진행 중인 호출이 있으면 새로 호출하지 않고 그 결과를 함께 스트리밍합니다.
+      호출은 백그라운드 스레드에서 돌기 때문에, rerun 으로 화면이 끊겨도 끝까지 받아 두었다가
+      linger 초 안에 같은 요청이 다시 오면 그대로 돌려줍니다.
+    """
+
+    def __init__(self, max_concurrency: int = 8, rate: float = 0.0, burst: int = 10, timeout: float = 90.0,
+                 queue_timeout: float = 30.0, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 linger: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.linger = linger
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate, burst)
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0, "retries": 0, "rejected": 0, "timeouts": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        env = os.environ.get
+        return cls(
+            max_concurrency=int(env("MINDSCAN_LLM_CONCURRENCY", "8")),
+            rate=float(env("MINDSCAN_LLM_RATE", "0")),
+            burst=int(env("MINDSCAN_LLM_BURST", "10")),
+            timeout=float(env("MINDSCAN_LLM_TIMEOUT", "90")),
+            queue_timeout=float(env("MINDSCAN_LLM_QUEUE_TIMEOUT", "30")),
+            max_retries=int(env("MINDSCAN_LLM_RETRIES", "3")),
+        )
+
+    def _incr(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def backoff(self, attempt: int) -> float:
+        """full jitter: 0 ~ min(max_delay, base_delay * 2^attempt) 사이에서 무작위로 기다립니다."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def stream(self, key: str, call: Callable[[], object], stream: bool = True, fresh: bool = False) -> "GatewayStream":
+        """call() 이 돌려주는 응답(스트리밍이면 조각 반복)을 텍스트 조각으로 흘려보냅니다.
+
+        fresh=True 면 같은 키의 이전 결과를 쓰지 않고 새로 호출합니다 (응답이 깨져 다시 요청할 때).
+        """
+        now = time.monotonic()
+        with self._lock:
+            for k in [k for k, f in self._flights.items() if f.done and now - f.finished_at > self.linger]:
+                del self._flights[k]
+            flight = self._flights.get(key)
+            if flight is not None and not fresh and (flight.error is None or not flight.done):
+                self.stats["coalesced"] += 1
+            else:
+                flight = _Flight(key)
+                self._flights[key] = flight
+                self.stats["calls"] += 1
+                threading.Thread(target=self._run, args=(flight, call, stream), daemon=True, name="llm-gateway").start()
+        return GatewayStream(self, flight, now + self.queue_timeout + self.timeout)
+
+    def _run(self, flight: _Flight, call: Callable[[], object], stream: bool):
+        try:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                self._incr("rejected")
+                raise LLMBusy("지금 이용자가 많아 AI 응답이 지연되고 있습니다. 잠시 후 다시 시도해주세요.")
+            try:
+                self._call_with_retry(flight, call, stream)
+            finally:
+                self._slots.release()
+        except BaseException as e:
+            self._incr("failures")
+            with flight.cond:
+                flight.error = e
+        finally:
+            flight._finish()
+            if flight.error is not None:
+                with self._lock:
+                    if self._flights.get(flight.key) is flight: del self._flights[flight.key]
+
+    def _call_with_retry(self, flight: _Flight, call: Callable[[], object], stream: bool):
+        attempt = 0
+        while True:
+            if not self._bucket.acquire(self.queue_timeout):
+                self._incr("rejected")
+                raise LLMBusy("요청이 너무 많습니다. 잠시 후 다시 시도해주세요.")
+            try:
+                response = call()
+                for chunk in (response if stream else [response]):
+                    text = _chunk_text(chunk)
+                    if text:
+                        with flight.cond:
+                            flight.chunks.append(text)
+                            flight.cond.notify_all()
+                flight.response = response
+                return
+            except Exception as e:
+                # 이미 일부를 흘려보냈다면 다시 호출하면 내용이 중복되므로 재시도하지 않음
+                if flight.chunks or attempt >= self.max_retries or not is_retryable(e): raise
+                attempt += 1
+                self._incr("retries")
+                time.sleep(self.backoff(attempt))
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            inflight = sum(1 for f in self._flights.values() if not f.done)
+            return {**self.stats, "inflight": inflight}
+
+
+class GatewayStream:
+    """게이트웨이 호출 결과. 반복하면 텍스트 조각이 나오고, 끝나면 .response 로 원본 응답을 볼 수 있습니다."""
+
+    def __init__(self, gateway: LLMGateway, flight: _Flight, deadline: float):
+        self._gateway = gateway
+        self._flight = flight
+        self._deadline = deadline
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            yield from self._flight.read(self._deadline)
+        except LLMTimeout:
+            self._gateway._incr("timeouts")
+            raise
+
+    @property
+    def response(self):
+        return self._flight.response
+
+    def add_done_callback(self, fn: Callable[["GatewayStream"], None]):
+        """호출이 끝나면 fn(self) 를 실행합니다 (기다리는 스레드 없이 다음 작업을 이어 붙일 때)."""
+        self._flight.add_done_callback(lambda: fn(self))
+
+    def text(self) -> str:
+        return "".join(self)
@@ -0,0 +1,210 @@
+import bisect
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ==========================================
+# [계측] 프로세스 내 히스토그램/카운터
+# ==========================================
+# 초 단위 지연 시간용 기본 버킷 (Prometheus 기본값과 비슷하게, LLM 응답을 고려해 60초까지)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+# 토큰 수 / 바이트 수용 버킷
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+BYTES_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_000_000, 5_000_000, 10_000_000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """버킷 경계로 근사한 분위수 (정확한 값이 아니라 상한)."""
+        if not self.count: return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank: return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """단계별 지연 시간/토큰/바이트/캐시 적중을 프로세스 안에서 집계합니다.
+
+    metrics.timer("llm_seconds", step="2") 처럼 이름 + 라벨로 기록하고,
+    snapshot() 이나 prometheus_text() 로 꺼내 봅니다. 다른 모듈의 stats 는
+    register_collector 로 등록해 두면 게이지로 함께 내보냅니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._buckets: Dict[str, tuple] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self.started_at = time.time()
+
+    def observe(self, name: str, value: float, buckets=None, **labels):
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = {}
+                self._buckets[name] = tuple(buckets or LATENCY_BUCKETS)
+            series = self._histograms[name]
+            key = _label_key(labels)
+            if key not in series: series[key] = Histogram(self._buckets[name])
+            series[key].observe(value)
+
+    def incr(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name: str, **labels):
+        """함수 실행 시간을 기록하는 데코레이터."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def register_collector(self, name: str, collect: Callable[[], Dict[str, float]]):
+        """collect() 가 돌려주는 숫자 값들을 mindscan_<name>_<key> 게이지로 내보냅니다."""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def _collect(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            collectors = dict(self._collectors)
+        gauges = {}
+        for name, collect in collectors.items():
+            try:
+                values = collect()
+            except Exception:
+                log.exception("metrics collector failed", extra={"fields": {"collector": name}})
+                continue
+            gauges[name] = {k: v for k, v in values.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        return gauges
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            histograms = {
+                name: [
+                    {"labels": dict(key), "count": h.count, "sum": round(h.sum, 4),
+                     "mean": round(h.sum / h.count, 4) if h.count else 0.0,
+                     "p50": h.quantile(0.5), "p95": h.quantile(0.95)}
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+            counters = {name: [{"labels": dict(key), "value": v} for key, v in series.items()]
+                        for name, series in self._counters.items()}
+        return {"uptime_seconds": round(time.time() - self.started_at, 1), "histograms": histograms,
+                "counters": counters, "gauges": self._collect()}
+
+    def prometheus_text(self, prefix: str = "mindscan") -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else repr(float(bound))
+                        lines.append(f"{metric}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {h.sum}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {h.count}")
+            for name, series in sorted(self._counters.items()):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{_format_labels(key)} {value}")
+        for name, values in sorted(self._collect().items()):
+            for key, value in sorted(values.items()):
+                metric = f"{prefix}_{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+# ==========================================
+# [구조화 로그] 사용자 화면 대신 stderr 로 JSON 한 줄씩
+# ==========================================
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3), "level": record.levelname, "logger": record.name,
+            "event": record.getMessage(), **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["error"] = f"{record.exc_info[0].__name__}: {record.exc_info[1]}"
+            entry["traceback"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _build_logger() -> logging.Logger:
+    logger = logging.getLogger("mindscan")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JSONFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+log = _build_logger()
+
+
+def log_exception(event: str, **fields) -> str:
+    """현재 처리 중인 예외를 트레이스백과 함께 기록하고, 사용자에게 보여줄 짧은 오류 ID를 돌려줍니다."""
+    error_id = uuid.uuid4().hex[:8]
+    log.exception(event, extra={"fields": {"error_id": error_id, **fields}})
+    metrics.incr("errors_total", event=event)
+    return error_id
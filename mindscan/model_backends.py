@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+# ==========================================
+# [모델 백엔드] AIModelManager 가 사용하는 모델 인터페이스
+# ==========================================
+# AIModelManager 는 google.generativeai.GenerativeModel 중 아래 두 가지만 사용합니다.
+#   - generate_content(content, stream=False, generation_config=None) -> 응답(.text, 스트리밍 시 청크 반복)
+#   - start_chat(history=[...]).send_message(message, stream=False, generation_config=None)
+# 같은 모양을 갖춘 객체면 어떤 백엔드든 끼워 넣을 수 있습니다.
+BACKEND_ENV_VAR = "MINDSCAN_MODEL_BACKEND"  # "gemini"(기본) 또는 "fake"
+
+
+# 이 오류가 나면 해당 모델은 쓸 수 없다고 보고 MODEL_PREFERENCES 의 다음 모델로 넘어갑니다.
+MODEL_UNAVAILABLE_ERRORS = {"NotFound", "PermissionDenied", "FailedPrecondition"}
+
+
+def is_model_unavailable(error: BaseException) -> bool:
+    code = getattr(error, "code", None)
+    return type(error).__name__ in MODEL_UNAVAILABLE_ERRORS or getattr(code, "value", code) == 404
+
+
+class ModelRegistry:
+    """프로세스 전체에서 공유하는 모델 클라이언트 레지스트리.
+
+    SDK 설정(genai.configure)은 API 키당 한 번만 하고, GenerativeModel 은
+    (모델 이름, 안전 설정, 생성 설정) 조합마다 하나만 만들어 모든 세션이 재사용합니다.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or os.environ.get(BACKEND_ENV_VAR, "gemini")
+        self._api_key: Optional[str] = None
+        self._sdk_key: Optional[str] = None  # genai.configure() 에 마지막으로 넘긴 키
+        self._models: Dict[str, object] = {}
+        self._unavailable: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, api_key: Optional[str]):
+        """키만 기억해 둡니다. SDK import/설정은 실제 모델을 처음 만들 때 합니다 (_sdk)."""
+        if self.backend == "fake" or not api_key: return
+        with self._lock:
+            if api_key == self._api_key: return
+            self._api_key = api_key
+            self._models.clear()  # 키가 바뀌면 클라이언트도 새로 생성
+
+    def _sdk(self):
+        """google.generativeai 를 처음 필요할 때 import 합니다 (import 만 1초 가까이 걸려 랜딩 페이지에서는 피함).
+
+        self._lock 을 잡은 상태에서 호출합니다.
+        """
+        import google.generativeai as genai
+        if self._sdk_key != self._api_key:
+            genai.configure(api_key=self._api_key)
+            self._sdk_key = self._api_key
+        return genai
+
+    @property
+    def ready(self) -> bool:
+        return self.backend == "fake" or self._api_key is not None
+
+    def get(self, model_name: str, safety_settings: List[Dict], generation_config: Optional[Dict] = None):
+        key = json.dumps([model_name, safety_settings, generation_config], sort_keys=True, ensure_ascii=False)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if self.backend == "fake":
+                    model = FakeModel()
+                elif self._api_key is None:
+                    raise RuntimeError("GOOGLE_API_KEY 가 설정되지 않았습니다.")
+                else:
+                    model = self._sdk().GenerativeModel(model_name, safety_settings=safety_settings, generation_config=generation_config)
+                self._models[key] = model
+            return model
+
+    def candidates(self, preferences: List[str]) -> List[str]:
+        """사용 가능한 모델 이름을 선호 순서대로 (모두 실패했으면 전체 목록을 다시 시도)."""
+        available = [name for name in preferences if name not in self._unavailable]
+        return available or list(preferences)
+
+    def mark_unavailable(self, model_name: str, error: BaseException):
+        with self._lock:
+            self._unavailable[model_name] = f"{type(error).__name__}: {error}"
+
+    def call(self, preferences: List[str], safety_settings: List[Dict], fn: Callable[[object], object],
+             generation_config: Optional[Dict] = None):
+        """선호 순서대로 모델을 골라 fn(model) 을 호출합니다. 모델을 쓸 수 없다는 오류면 다음 모델로 넘어갑니다."""
+        names = self.candidates(preferences)
+        for i, name in enumerate(names):
+            try:
+                return fn(self.get(name, safety_settings, generation_config))
+            except Exception as e:
+                if i == len(names) - 1 or not is_model_unavailable(e): raise
+                self.mark_unavailable(name, e)
+
+    def warmup(self, preferences: List[str], safety_settings: List[Dict], generation_config: Optional[Dict] = None) -> Dict[str, str]:
+        """서버 시작 시 선호 모델 클라이언트를 미리 만들어 둡니다 (네트워크 호출 없음)."""
+        built = {}
+        for name in preferences:
+            try:
+                self.get(name, safety_settings, generation_config)
+                built[name] = "ready"
+            except Exception as e:
+                built[name] = f"{type(e).__name__}: {e}"
+        return built
+
+    def describe(self) -> Dict[str, object]:
+        with self._lock:
+            return {"backend": self.backend, "configured": self.ready, "clients": len(self._models),
+                    "unavailable": dict(self._unavailable)}
+
+
+# ==========================================
+# [로컬 가짜 모델] API 호출 없이 부하 테스트용
+# ==========================================
+FAKE_PROFILE = """**[Profile]**
+**👾 난이도**: [중] 겉은 차갑지만 속은 따뜻한 반전 매력
+**⚔️ 강점**: #통찰력 #공감능력 #창의성
+**🩸 약점**: #내향성 #감정 기복 #예민함
+<br>
+**✨ 타고난 성향**
+처음에는 조심스럽지만 한 번 마음을 열면 깊이 있는 관계를 원하는 타입입니다.
+**🗣️ 대화 스타일**
+짧고 담백한 답장을 선호하지만, 관심 있는 주제에는 길게 이야기합니다.
+**💘 공략 포인트**
+부담 없는 질문으로 대화를 이어가고, 답장을 재촉하지 마세요."""
+
+FAKE_PREDICTION = """**🎯 핵심 분석 (승률 65%)**
+상대는 화가 났다기보다 생각을 정리할 시간이 필요한 상태입니다.
+
+**🔮 미래 예측**
+먼저 가볍게 안부를 건네면 하루 이틀 안에 평소처럼 답장이 올 가능성이 높습니다.
+
+**🎲 주요 변수**
+상대의 업무/학업 일정이 바쁘면 답장이 늦어질 수 있습니다."""
+
+FAKE_CHAT_REPLIES = [
+    {"reply": "아 진짜? ㅋㅋ 나도 그 생각 했는데", "emotion": "😊", "thoughts": "먼저 연락 와서 내심 반가움", "tips": "가볍게 공감하며 질문을 이어가세요", "warning": "갑자기 진지한 얘기는 피하세요"},
+    {"reply": "음.. 좀 생각해볼게", "emotion": "🤔", "thoughts": "아직 마음이 다 풀리진 않음", "tips": "답을 재촉하지 말고 기다려주세요", "warning": "연속 메시지는 부담이 될 수 있어요"},
+    {"reply": "ㅎㅎ 고마워 덕분에 기분 좋아졌어", "emotion": "🥰", "thoughts": "배려받는 느낌이라 호감 상승", "tips": "지금 분위기에서 약속을 제안해보세요", "warning": "너무 들뜬 티는 내지 마세요"},
+]
+
+
+class FakeModelError(RuntimeError):
+    """가짜 모델이 주입한 오류. retryable=True 면 429/503처럼 재시도 가능한 오류로 취급합니다."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+        self.code = 429 if retryable else 400
+
+
+@dataclass
+class FakeModelConfig:
+    first_token_latency: float = 0.3  # 첫 청크까지 걸리는 시간(초)
+    chunk_latency: float = 0.02       # 청크 사이 간격(초)
+    chunk_size: int = 12              # 청크당 글자 수
+    error_rate: float = 0.0           # 오류 주입 확률 (0~1)
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeModelConfig":
+        return cls(
+            first_token_latency=float(os.environ.get("MINDSCAN_FAKE_FIRST_TOKEN_LATENCY", cls.first_token_latency)),
+            chunk_latency=float(os.environ.get("MINDSCAN_FAKE_CHUNK_LATENCY", cls.chunk_latency)),
+            chunk_size=int(os.environ.get("MINDSCAN_FAKE_CHUNK_SIZE", cls.chunk_size)),
+            error_rate=float(os.environ.get("MINDSCAN_FAKE_ERROR_RATE", cls.error_rate)),
+            seed=int(os.environ.get("MINDSCAN_FAKE_SEED", cls.seed)),
+        )
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class _FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeResponse:
+    """GenerateContentResponse 와 같은 모양: .text / 스트리밍 반복 / usage_metadata."""
+
+    def __init__(self, text: str, prompt_text: str, config: FakeModelConfig, stream: bool):
+        self._text = text
+        self._config = config
+        self._stream = stream
+        self.usage_metadata = _UsageMetadata(len(prompt_text) // 2 + 1, len(text) // 2 + 1)
+        if not stream:
+            time.sleep(config.first_token_latency + config.chunk_latency * (len(text) // max(config.chunk_size, 1)))
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def __iter__(self) -> Iterator[_FakeChunk]:
+        if not self._stream:
+            yield _FakeChunk(self._text)
+            return
+        time.sleep(self._config.first_token_latency)
+        size = max(self._config.chunk_size, 1)
+        for i in range(0, len(self._text), size):
+            if i: time.sleep(self._config.chunk_latency)
+            yield _FakeChunk(self._text[i:i + size])
+
+
+def _content_text(content) -> str:
+    parts = content if isinstance(content, list) else [content]
+    return "\n".join(p for p in parts if isinstance(p, str))
+
+
+class FakeModel:
+    """미리 준비한 프로필/예측/채팅 JSON을 돌려주는 결정적 가짜 Gemini 모델."""
+
+    model_name = "fake"
+
+    def __init__(self, config: Optional[FakeModelConfig] = None):
+        self.config = config or FakeModelConfig.from_env()
+        self.calls = 0
+
+    def _rng(self, prompt_text: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.config.seed}:{self.calls}:{prompt_text}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _respond(self, text: str, prompt_text: str, stream: bool) -> FakeResponse:
+        self.calls += 1
+        if self.config.error_rate and self._rng(prompt_text).random() < self.config.error_rate:
+            time.sleep(self.config.first_token_latency / 2)
+            raise FakeModelError("429 Resource has been exhausted (fake)")
+        return FakeResponse(text, prompt_text, self.config, stream)
+
+    def generate_content(self, content, stream: bool = False, generation_config=None, **kwargs) -> FakeResponse:
+        prompt_text = _content_text(content)
+        text = FAKE_PREDICTION if "[출력 형식]" in prompt_text else FAKE_PROFILE
+        return self._respond(text, prompt_text, stream)
+
+    def start_chat(self, history: Optional[List[Dict]] = None, **kwargs) -> "FakeChatSession":
+        return FakeChatSession(self, history or [])
+
+
+class FakeChatSession:
+    def __init__(self, model: FakeModel, history: List[Dict]):
+        self.model = model
+        self.history = history
+
+    def send_message(self, content, stream: bool = False, generation_config=None, **kwargs) -> FakeResponse:
+        message = _content_text(content)
+        prompt_text = "\n".join(_content_text(h.get("parts", [])) for h in self.history) + "\n" + message
+        reply = FAKE_CHAT_REPLIES[int(hashlib.sha256(message.encode("utf-8")).hexdigest(), 16) % len(FAKE_CHAT_REPLIES)]
+        return self.model._respond(json.dumps(reply, ensure_ascii=False), prompt_text, stream)
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,114 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from mindscan.metrics import log
+
+
+class PrefetchPool:
+    """모든 세션이 함께 쓰는 추측 실행(prefetch)용 스레드 풀.
+
+    유저가 다음 화면으로 넘어가기 전에 필요한 작업(모델 준비, 다음 단계 LLM 호출,
+    채팅 페르소나 구성)을 미리 시작해 두고, 결과는 다음 rerun 에서 가져갑니다.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = int(os.environ.get("MINDSCAN_PREFETCH_WORKERS", "4"))
+        self.max_workers = max(max_workers, 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "reused": 0, "hits": 0, "misses": 0, "failed": 0}
+
+    def _incr(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prefetch")
+            self.stats["submitted"] += 1
+            return self._executor.submit(fn, *args)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+
+prefetch_pool = PrefetchPool()
+
+
+def _copy_result(source: Future, target: Future):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class SessionTasks:
+    """세션에 붙는 백그라운드 작업 모음 (st.session_state 에 보관).
+
+    작업은 이름과 입력 키로 구분합니다. 같은 이름/키로 다시 요청하면 진행 중인 작업을
+    그대로 쓰고, 키가 바뀌면(입력이 달라지면) 새로 시작합니다. result() 는 기다리지 않고
+    끝난 결과만 돌려주므로 스크립트 스레드가 막히지 않습니다.
+    """
+
+    def __init__(self):
+        # 풀은 세션 상태에 넣지 않고 모듈 전역(prefetch_pool)을 씀 (세션 메모리 집계에 섞이지 않게)
+        self._tasks: Dict[str, Tuple[str, Future]] = {}
+
+    def submit(self, name: str, key: str, fn: Callable, *args) -> Future:
+        task = self._tasks.get(name)
+        if task is not None and task[0] == key:
+            prefetch_pool._incr("reused")
+            return task[1]
+        return self._track(name, key, prefetch_pool.submit(fn, *args))
+
+    def submit_after(self, name: str, key: str, source, fn: Callable, *args) -> Future:
+        """source(add_done_callback 이 있는 게이트웨이 호출 등)가 끝난 뒤에 fn 을 풀에서 실행합니다.
+
+        기다리는 동안 풀 스레드를 잡고 있지 않으므로, 느린 LLM 응답이 다른 세션의 미리 준비 작업을 막지 않습니다.
+        """
+        task = self._tasks.get(name)
+        if task is not None and task[0] == key:
+            prefetch_pool._incr("reused")
+            return task[1]
+        future: Future = Future()
+
+        def start(_):
+            if not future.set_running_or_notify_cancel(): return  # 그 사이 discard() 된 작업
+            prefetch_pool.submit(fn, *args).add_done_callback(lambda f: _copy_result(f, future))
+
+        source.add_done_callback(start)
+        return self._track(name, key, future)
+
+    def _track(self, name: str, key: str, future: Future) -> Future:
+        future.add_done_callback(lambda f: self._log_failure(name, f))
+        self._tasks[name] = (key, future)
+        return future
+
+    def _log_failure(self, name: str, future: Future):
+        if future.cancelled() or future.exception() is None: return
+        prefetch_pool._incr("failed")
+        error = future.exception()
+        log.warning("prefetch failed", extra={"fields": {"task": name, "error": f"{type(error).__name__}: {error}"}})
+
+    def get(self, name: str, key: Optional[str] = None) -> Optional[Future]:
+        task = self._tasks.get(name)
+        if task is None or (key is not None and task[0] != key): return None
+        return task[1]
+
+    def result(self, name: str, key: Optional[str] = None, default=None):
+        """끝난 작업의 결과 (아직 진행 중이거나 실패했거나 키가 다르면 default)."""
+        future = self.get(name, key)
+        if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+            prefetch_pool._incr("misses")
+            return default
+        prefetch_pool._incr("hits")
+        return future.result()
+
+    def discard(self, name: str):
+        task = self._tasks.pop(name, None)
+        if task is not None: task[1].cancel()
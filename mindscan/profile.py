@@ -0,0 +1,138 @@
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+# ==========================================
+# [프로필] Step 2 성향 분석 결과의 구조화된 형태
+# ==========================================
+# Step 2 는 아래 모양의 마크다운을 돌려줍니다 (mindscan/prompts.py 의 출력 예시).
+#   **[Profile]**
+#   **👾 난이도**: [중] 겉은 차갑지만 속은 따뜻한 반전 매력
+#   **⚔️ 강점**: #통찰력 #공감능력 #창의성
+#   **🩸 약점**: #내향성 #감정 기복 #예민함
+#   **✨ 타고난 성향**
+#   (내용) ...
+# 한 번만 파싱해 두고 화면/카드/프롬프트가 같은 결과를 씁니다.
+
+# 필드 이름 -> (이모지, 라벨)
+FIELD_LABELS = {"difficulty": ("👾", "난이도"), "strengths": ("⚔️", "강점"), "weaknesses": ("🩸", "약점")}
+_FIELD_BY_LABEL = {label: name for name, (_, label) in FIELD_LABELS.items()}
+
+# 굵은 글씨가 빠진 응답에서도 구역 제목으로 볼 이모지
+SECTION_EMOJIS = ["✨", "🗣️", "💘", "🎯", "🔮", "🎲"]
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+_FIELD_LINE = re.compile(r"^[^\w\s]*\s*(난이도|강점|약점)\s*[:：]\s*(.*)$")
+_LEVEL = re.compile(r"^\[([^\]]+)\]\s*(.*)$")
+_LEADING_SYMBOLS = re.compile(r"^[^\w\[(]+")
+
+
+class ProfileSection(NamedTuple):
+    title: str  # "✨ 타고난 성향" (제목 없이 시작한 내용이면 "")
+    body: str   # 줄바꿈으로 이어진 본문
+
+
+@dataclass(frozen=True)
+class Profile:
+    difficulty: str = ""          # 난이도 등급 (최상/상/중/하/최하)
+    difficulty_note: str = ""     # 난이도 한 줄 설명
+    strengths: Tuple[str, ...] = ()
+    weaknesses: Tuple[str, ...] = ()
+    sections: Tuple[ProfileSection, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.difficulty or self.difficulty_note or self.strengths or self.weaknesses or self.sections)
+
+    def field_lines(self) -> List[Tuple[str, str]]:
+        """화면/카드에 그대로 쓰는 (라벨, 값) 목록. 예: ("👾 난이도", "[중] 겉은 차갑지만 ...")."""
+        lines = []
+        if self.difficulty or self.difficulty_note:
+            level = f"[{self.difficulty}] " if self.difficulty else ""
+            lines.append(("{} {}".format(*FIELD_LABELS["difficulty"]), f"{level}{self.difficulty_note}".strip()))
+        for name in ("strengths", "weaknesses"):
+            tags = getattr(self, name)
+            if tags: lines.append(("{} {}".format(*FIELD_LABELS[name]), " ".join(f"#{tag}" for tag in tags)))
+        return lines
+
+    def to_prompt(self) -> str:
+        """다음 단계 프롬프트에 넣는 짧은 요약 (마크다운 기호/이모지/빈 줄 없이 항목당 한 줄)."""
+        lines = []
+        if self.difficulty or self.difficulty_note:
+            lines.append(f"난이도: {' - '.join(part for part in (self.difficulty, self.difficulty_note) if part)}")
+        if self.strengths: lines.append(f"강점: {', '.join(self.strengths)}")
+        if self.weaknesses: lines.append(f"약점: {', '.join(self.weaknesses)}")
+        for section in self.sections:
+            body = " ".join(section.body.split())
+            title = _LEADING_SYMBOLS.sub("", section.title).strip()
+            lines.append(f"{title}: {body}" if title else body)
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict:
+        return {"difficulty": self.difficulty, "difficulty_note": self.difficulty_note,
+                "strengths": list(self.strengths), "weaknesses": list(self.weaknesses),
+                "sections": [{"title": s.title, "body": s.body} for s in self.sections]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Profile":
+        return cls(data.get("difficulty", ""), data.get("difficulty_note", ""),
+                   tuple(data.get("strengths", ())), tuple(data.get("weaknesses", ())),
+                   tuple(ProfileSection(s["title"], s["body"]) for s in data.get("sections", ())))
+
+    def to_json(self) -> str:
+        """캐시 키/저장용 직렬화 (같은 프로필이면 항상 같은 문자열)."""
+        return json.dumps(self.to_dict(), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def _tags(value: str) -> Tuple[str, ...]:
+    tags = [tag.strip(" ,") for tag in value.split("#")] if "#" in value else value.split(",")
+    return tuple(tag.strip() for tag in tags if tag.strip())
+
+
+@lru_cache(maxsize=1024)
+def parse_profile(raw_text: str) -> Profile:
+    """Step 2 결과 마크다운을 한 번 훑어 Profile 로 바꿉니다 (같은 원문은 프로세스에서 한 번만 파싱).
+
+    형식을 벗어난 줄도 버리지 않고 가까운 구역 본문에 넣으므로, 원문 내용은 그대로 남습니다.
+    """
+    fields: Dict[str, object] = {}
+    sections: List[ProfileSection] = []
+    title, body = None, []
+
+    for line in (raw_text or "").splitlines():
+        plain = _HTML_TAG.sub("", line).replace("&nbsp;", " ").strip()
+        text = plain.replace("**", "").strip()
+        if not text or text == "---" or text.strip("[]").lower() == "profile": continue
+
+        match = _FIELD_LINE.match(text)
+        if match:
+            name, value = _FIELD_BY_LABEL[match.group(1)], match.group(2).strip()
+            if name == "difficulty":
+                level = _LEVEL.match(value)
+                fields["difficulty"], fields["difficulty_note"] = (level.group(1), level.group(2)) if level else ("", value)
+            else:
+                fields[name] = _tags(value)
+            continue
+
+        is_heading = (plain.startswith("**") and plain.endswith("**") and plain.count("**") == 2) \
+            or (any(text.startswith(emoji) for emoji in SECTION_EMOJIS) and ":" not in text)
+        if is_heading:
+            if title is not None or body: sections.append(ProfileSection(title or "", "\n".join(body)))
+            title, body = text, []
+        else:
+            body.append(text)
+    if title is not None or body: sections.append(ProfileSection(title or "", "\n".join(body)))
+    return Profile(sections=tuple(sections), **fields)
+
+
+class AnalysisResult:
+    """Step 2 결과. 원문(raw_text)은 스트리밍 화면과 분석 캐시에, profile 은 이후 단계(화면/카드/프롬프트)에 씁니다."""
+
+    def __init__(self, raw_text: str = ""):
+        self.raw_text = raw_text
+        self.profile = self.parse_profile(raw_text)
+
+    @staticmethod
+    def parse_profile(raw_text: str) -> Profile:
+        return parse_profile(raw_text)
@@ -0,0 +1,118 @@
+import re
+from typing import Dict, Optional
+
+from mindscan.analysis_cache import NAME_TOKEN
+
+# ==========================================
+# [프롬프트] Step 2 / Step 3.5 / Step 4
+# ==========================================
+# 앱(app.py)과 일괄 실행 CLI(mindscan/batch.py)가 같은 프롬프트를 쓰도록 여기에 모아 둡니다.
+# 들여쓰기/문구는 원래 app.py 의 프롬프트를 그대로 두고, 바꾼 곳만 아래처럼 다릅니다 (모델이 받는 내용이 달라짐).
+#   - Step 2: 이름 대신 NAME_TOKEN 을 보내고 그대로 쓰라는 지시 한 줄 추가 (PROFILE_PROMPT_VERSION 2)
+#   - Step 3.5 / 4: 성향 분석 원문 대신 Profile.to_prompt() 요약을 넣음
+#   - Step 4: 메시지마다 보내던 프롬프트를 대화 첫 턴의 페르소나로 한 번만 보냄 (유저 메시지는 대화 기록으로)
+
+# Step 2 프롬프트를 고치면 올려서 이전 캐시를 무효화합니다.
+# 2: 이름 대신 NAME_TOKEN 을 보냄 (이름이 들어간 예전 결과가 다른 유저에게 가지 않도록 버전 1 캐시는 버림)
+PROFILE_PROMPT_VERSION = "2"
+
+
+def profile_prompt(target_gender: str, target_birth) -> str:
+    """Step 2 프롬프트. 분석 결과를 같은 성별/생년월일의 다른 세션과 공유하므로 대상 이름은 넣지 않습니다.
+
+    모델이 쓴 NAME_TOKEN 은 화면에 보여줄 때 AnalysisCache.restore_name 으로 이름으로 바꿉니다.
+    """
+    return f"""
+                    역할: 당신은 최고의 심리 분석가입니다. 대상의 생일 데이터를 기반으로 사주, 점성학 데이터를 심도있게 해석합니다.
+                    대상: {NAME_TOKEN}({target_gender}, {target_birth})의 심리 성향을 분석해주세요.
+                    
+                    [지시사항]
+                    1. 전문 용어(사주, 점성학)는 절대 사용하지 말고, 쉬운 심리학 표현을 쓰세요.
+                    2. **난이도, 강점, 약점**은 반드시 **각각 한 줄씩** 작성하세요.
+                    3. 강점과 약점의 키워드는 문장이 아니라 **단어로 나열**하고 앞에 **#**을 붙이세요.
+                    4. 불필요한 서론이나 기호(-, *)를 쓰지 말고 아래 **[출력 예시]** 와 똑같은 구조로 출력하세요.
+                    5. 난이도는 [최상/상/중/하/최하] 중에 적합한 것으로 골라 작성하세요.
+                    6. 대상을 부를 때는 {NAME_TOKEN} 를 그대로 쓰세요.
+                    
+                    [출력 예시 - 이 구조를 그대로 따르세요]
+
+                    **[Profile]**
+                    **👾 난이도**: [중] 겉은 차갑지만 속은 따뜻한 반전 매력 
+                    **⚔️ 강점**: #통찰력 #공감능력 #창의성 
+                    **🩸 약점**: #내향성 #감정 기복 #예민함 
+                    <br>
+                    **✨ 타고난 성향**
+                    (내용)
+                    **🗣️ 대화 스타일**
+                    (내용)
+                    **💘 공략 포인트**
+                    (내용)
+                    """
+
+
+def prediction_prompt(profile_text: str, context_text: str) -> str:
+    """profile_text 는 Profile.to_prompt() 로 줄인 성향 요약 (마크다운 원문 대신 넣어 입력 토큰을 줄임)."""
+    return f"""
+                대상:{profile_text}
+                상황:{context_text}
+                
+                [미션]
+                1. 현재 상황에서 가장 가능성이 높은 **단 하나의 시나리오**를 도출하세요.
+                2. 상대의 심리 데이터를 기반으로 이 상황에서 발생할 수 있는 주요 변수(상대의 기분 변화, 외부 요인 등)를 예측하세요.
+                3. 전문 용어 없이 친절한 심리 상담가처럼 설명하세요.
+                
+                [출력 형식]
+                **🎯 핵심 분석 (승률 00%)**
+                (가장 유력한 상황 분석 내용 - 3문장 이내)
+                
+                **🔮 미래 예측**
+                (당신이 이렇게 행동했을 때 벌어질 일 예측)
+                
+                **🎲 주요 변수**
+                (주의해야 할 돌발 변수 1가지)
+                """
+
+
+def persona_prompt(target_name: str, profile_text: str, general_analysis: str) -> str:
+    return f"""
+                    역할: {target_name} ({profile_text})
+                    현재상황: {general_analysis}
+                    
+                    지금부터 유저가 당신에게 메시지를 보냅니다. 메시지마다 아래 미션을 수행하세요.
+                    
+                    [미션]
+                    1. 당신(페르소나)의 말투로 **가장 적절한 답장(reply)** 하나를 작성하세요. (카톡 말투, 짧게,확률표시시)
+                    2. 현재 당신의 **감정(emotion)**을 이모티콘 하나로 표현하세요.
+                    3. 당신의 **속마음(thoughts)**, 유저를 위한 **공략팁(tips)**, **주의사항(warning)**을 분석하세요.
+                    
+                    [반드시 JSON 형식으로만 출력하세요]
+                    {{
+                        "reply": "여기에 답장 내용",
+                        "emotion": "🥰",
+                        "thoughts": "여기에 속마음",
+                        "tips": "여기에 팁",
+                        "warning": "여기에 주의사항"
+                    }}
+                    """
+
+
+# ==========================================
+# [응답 해석] 마크다운 결과를 구역별로 나누기
+# ==========================================
+# "**🎯 핵심 분석 (승률 65%)**" 처럼 한 줄 전체가 굵은 글씨인 줄을 구역 제목으로 봅니다.
+SECTION_HEADER = re.compile(r"^\s*\*\*([^*]+?)\*\*\s*$", re.M)
+WIN_RATE = re.compile(r"승률\s*(\d{1,3})\s*%")
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """구역 제목 -> 본문 (제목 앞의 내용은 버림)."""
+    headers = list(SECTION_HEADER.finditer(text or ""))
+    return {m.group(1).strip(): text[m.end():headers[i + 1].start() if i + 1 < len(headers) else len(text)].strip()
+            for i, m in enumerate(headers)}
+
+
+def parse_prediction(text: str) -> Dict[str, object]:
+    """Step 3.5 예측 결과에서 승률(없으면 None)과 구역별 본문을 꺼냅니다."""
+    match = WIN_RATE.search(text or "")
+    win_rate: Optional[int] = int(match.group(1)) if match else None
+    return {"win_rate": win_rate, "sections": split_sections(text)}
@@ -0,0 +1,92 @@
+import base64
+import io
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class QRCodeEntry(NamedTuple):
+    matrix: List[List[bool]]
+    png: bytes
+    data_uri: str
+    image: "Image.Image"
+
+
+class QRService:
+    """QR 코드를 (url, box_size, border, 색상)별로 한 번만 만들어 재사용합니다.
+
+    서비스 URL처럼 자주 쓰는 값은 warmup() 으로 미리 만들어 두고, 결과별 공유 URL은
+    최대 max_items 개까지 LRU로 보관합니다.
+    """
+
+    def __init__(self, max_items: int = 128):
+        self.max_items = max_items
+        self._entries: "OrderedDict[Tuple, QRCodeEntry]" = OrderedDict()
+        self._pinned: Dict[Tuple, QRCodeEntry] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _build(self, url: str, box_size: int, border: int, fill_color: str, back_color: str) -> QRCodeEntry:
+        import qrcode  # 첫 QR 을 만들 때만 import (PIL 도 함께 불러옴)
+        qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
+        qr.add_data(url)
+        qr.make(fit=True)
+        image = qr.make_image(fill_color=fill_color, back_color=back_color).get_image().convert("RGBA")
+        buffered = io.BytesIO()
+        image.save(buffered, format="PNG")
+        png = buffered.getvalue()
+        data_uri = f"data:image/png;base64,{base64.b64encode(png).decode()}"
+        return QRCodeEntry(qr.get_matrix(), png, data_uri, image)
+
+    def get(self, url: str, box_size: int = 10, border: int = 2, fill_color: str = "white", back_color: str = "transparent", pin: bool = False) -> QRCodeEntry:
+        key = (url, box_size, border, fill_color, back_color)
+        with self._lock:
+            entry = self._pinned.get(key) or self._entries.get(key)
+            if entry is not None:
+                if key in self._entries: self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+            self.stats["misses"] += 1
+        entry = self._build(url, box_size, border, fill_color, back_color)
+        with self._lock:
+            if pin:
+                self._pinned[key] = entry
+            else:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_items:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def data_uri(self, url: str, **options) -> str:
+        """<img src> 에 바로 넣을 수 있는 base64 data URI."""
+        return self.get(url, **options).data_uri
+
+    def png(self, url: str, **options) -> bytes:
+        return self.get(url, **options).png
+
+    def image(self, url: str, **options) -> "Image.Image":
+        """카드 등에 붙여 넣을 RGBA 이미지 (복사본)."""
+        return self.get(url, **options).image.copy()
+
+    def svg(self, url: str, box_size: int = 10, border: int = 2, fill_color: str = "white", back_color: str = "transparent") -> str:
+        """같은 QR 행렬로 만든 SVG 문자열 (확대해도 깨지지 않음)."""
+        matrix = self.get(url, box_size=box_size, border=border, fill_color=fill_color, back_color=back_color).matrix
+        size = len(matrix) * box_size
+        path = "".join(
+            f"M{x * box_size},{y * box_size}h{box_size}v{box_size}h-{box_size}z"
+            for y, row in enumerate(matrix) for x, cell in enumerate(row) if cell
+        )
+        background = "" if back_color == "transparent" else f'<rect width="100%" height="100%" fill="{back_color}"/>'
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">'
+                f'{background}<path d="{path}" fill="{fill_color}"/></svg>')
+
+    def warmup(self, urls: List[str], **options):
+        """서비스 URL 등 항상 쓰는 QR을 미리 만들고 LRU에서 밀려나지 않게 고정합니다."""
+        for url in urls:
+            self.get(url, pin=True, **options)
+
+
+qr_service = QRService()
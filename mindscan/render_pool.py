@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from mindscan.profile import Profile
+
+
+class RenderQueueFull(RuntimeError):
+    """대기 중인 렌더링 작업이 너무 많아 새 작업을 받을 수 없을 때 발생합니다."""
+
+
+def _render_card(title: str, target_name: str, profile: Profile, variants=None) -> Dict:
+    """워커 프로세스에서 실행됩니다. 폰트/배경 캐시는 워커마다 한 번씩만 만들어집니다."""
+    from mindscan.share_card import ShareManager
+    return ShareManager(variants=variants).create_result_image(title, target_name, profile)
+
+
+def _warmup() -> bool:
+    from mindscan.fonts import font_registry
+    font_registry.warmup()
+    return True
+
+
+# __main__ 은 프로세스 전역이므로 풀이 여러 개여도 워커를 띄우는 일은 한 번에 하나씩
+_spawn_lock = threading.Lock()
+
+
+@contextmanager
+def _hide_streamlit_main():
+    """Streamlit은 실행 중 __main__ 을 app.py 로 바꿔 둡니다.
+
+    spawn 워커는 시작할 때 __main__ 파일을 다시 실행하므로, 워커를 띄우는 동안만
+    빈 모듈로 가려서 워커가 app.py(UI 전체)를 다시 실행하지 않게 합니다.
+    풀을 처음 만들 때 _spawn_lock 안에서 한 번만 씁니다 (submit 마다 바꾸면 다른 세션 스레드와 엇갈림).
+    """
+    original = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = original
+
+
+class RenderPool:
+    """공유 카드 렌더링을 Streamlit 스크립트 스레드 밖의 프로세스 풀에서 처리합니다.
+
+    같은 키의 작업이 이미 진행 중이면 그 Future를 그대로 돌려주고(중복 제거),
+    대기 작업이 max_pending 을 넘으면 RenderQueueFull 로 거절합니다(백프레셔).
+    max_workers 가 0이면 풀 없이 호출한 스레드에서 바로 렌더링합니다.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 16):
+        if max_workers is None:
+            max_workers = int(os.environ.get("MINDSCAN_RENDER_WORKERS", min(2, os.cpu_count() or 1)))
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "deduplicated": 0, "rejected": 0, "failed": 0, "restarted": 0}
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers <= 0: return None
+        if self._executor is None:
+            with _spawn_lock, _hide_streamlit_main():
+                # Streamlit 서버는 여러 스레드를 쓰므로 fork 대신 spawn 으로 워커를 띄웁니다.
+                executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                # spawn 워커는 쉬는 워커가 없을 때 submit 마다 하나씩 생기므로, 워커 수만큼 폰트 로드 작업을
+                # 한꺼번에 넣어 여기서 모두 띄움 (이후 submit 은 떠 있는 워커를 재사용하고 __main__ 을 건드리지 않음)
+                for _ in range(self.max_workers): executor.submit(_warmup)
+            self._executor = executor
+        return self._executor
+
+    def warmup(self):
+        """워커 프로세스를 미리 띄우고 폰트를 로드해 첫 카드의 지연을 줄입니다."""
+        with self._lock:
+            self._get_executor()
+
+    def submit(self, key: str, title: str, target_name: str, profile: Profile, variants=None) -> Future:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["deduplicated"] += 1
+                return future
+            if len(self._inflight) >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise RenderQueueFull(f"렌더링 대기열이 가득 찼습니다 ({self.max_pending}건)")
+            executor = self._get_executor()
+            if executor is None:
+                future = Future()
+            else:
+                try:
+                    future = executor.submit(_render_card, title, target_name, profile, variants)
+                except BrokenProcessPool:
+                    # 워커가 죽으면(OOM, Pillow segfault, kill) 풀은 계속 깨진 상태로 남으므로 버리고 새 풀로 한 번만 재시도
+                    # (다시 실패하면 BrokenProcessPool 을 그대로 올려 호출한 쪽에서 경고로 처리)
+                    self._reset_executor(executor)
+                    future = self._get_executor().submit(_render_card, title, target_name, profile, variants)
+            self._inflight[key] = future
+            self.stats["submitted"] += 1
+        future.add_done_callback(lambda f: self._done(key, f))
+
+        if executor is None:
+            try:
+                future.set_result(_render_card(title, target_name, profile, variants))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def _reset_executor(self, executor: ProcessPoolExecutor):
+        executor.shutdown(wait=False, cancel_futures=True)
+        if self._executor is executor: self._executor = None
+        self.stats["restarted"] += 1
+
+    def _done(self, key: str, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if not future.cancelled() and future.exception() is not None:
+            self.stats["failed"] += 1
+
+    @property
+    def pending(self) -> int:
+        return len(self._inflight)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,117 @@
+import json
+import re
+import threading
+from typing import Dict, Optional
+
+# Step 4 채팅 답변 스키마 (Gemini structured output: response_mime_type + response_schema)
+CHAT_FIELDS = ["reply", "emotion", "thoughts", "tips", "warning"]
+CHAT_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {field: {"type": "STRING"} for field in CHAT_FIELDS},
+    "required": CHAT_FIELDS,
+}
+CHAT_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": CHAT_RESPONSE_SCHEMA}
+
+_FENCE = re.compile(r"```(?:json|JSON)?")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"'})
+
+
+class _DecoderStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"direct": 0, "extracted": 0, "repaired": 0, "failures": 0, "retries": 0}
+
+    def incr(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+decoder_stats = _DecoderStats()
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """텍스트에서 처음 나오는 균형 잡힌 {...} 를 찾습니다 (문자열 안의 괄호/이스케이프는 무시).
+
+    끝까지 닫히지 않았으면(응답이 잘린 경우) 시작 위치부터 끝까지를 돌려줍니다.
+    """
+    start = text.find("{")
+    if start < 0: return None
+    depth = 0
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped: escaped = False
+            elif ch == "\\": escaped = True
+            elif ch == '"': in_string = False
+        elif ch == '"': in_string = True
+        elif ch == "{": depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0: return text[start:i + 1]
+    return text[start:]
+
+
+def repair_json(candidate: str) -> str:
+    """LLM이 자주 깨뜨리는 부분(스마트 따옴표, 문자열 속 줄바꿈, 꼬리 쉼표, 잘린 끝)을 고칩니다."""
+    candidate = candidate.translate(_SMART_QUOTES)
+    out = []
+    stack = []
+    in_string = escaped = False
+    for ch in candidate:
+        if in_string:
+            if escaped: escaped = False
+            elif ch == "\\": escaped = True
+            elif ch == '"': in_string = False
+            elif ch == "\n": ch = "\\n"
+            elif ch == "\t": ch = "\\t"
+        elif ch == '"': in_string = True
+        elif ch in "{[": stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack: stack.pop()
+        out.append(ch)
+    repaired = "".join(out)
+    if in_string: repaired += '"'
+    repaired = repaired.rstrip().rstrip(",")
+    repaired += "".join(reversed(stack))
+    return _TRAILING_COMMA.sub(r"\1", repaired)
+
+
+def _as_reply(data) -> Optional[Dict[str, str]]:
+    if not isinstance(data, dict) or not isinstance(data.get("reply"), str): return None
+    return {field: "" if data.get(field) is None else str(data.get(field)) for field in CHAT_FIELDS}
+
+
+def decode_chat_reply(text: str) -> Optional[Dict[str, str]]:
+    """채팅 답변 JSON을 해석합니다. 복구할 수 없으면 None (이때만 재요청)."""
+    try:
+        data = _as_reply(json.loads(text))
+        if data is not None:
+            decoder_stats.incr("direct")
+            return data
+    except ValueError:
+        pass
+
+    candidate = extract_json_object(_FENCE.sub("", text))
+    if candidate:
+        try:
+            data = _as_reply(json.loads(candidate))
+            if data is not None:
+                decoder_stats.incr("extracted")
+                return data
+        except ValueError:
+            pass
+        try:
+            data = _as_reply(json.loads(repair_json(candidate)))
+            if data is not None:
+                decoder_stats.incr("repaired")
+                return data
+        except ValueError:
+            pass
+
+    decoder_stats.incr("failures")
+    return None
@@ -0,0 +1,102 @@
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, MutableMapping, Optional
+
+
+def estimate_size(value, _seen: Optional[set] = None) -> int:
+    """세션 값이 차지하는 대략적인 바이트 수 (같은 객체를 여러 번 참조해도 한 번만 셉니다)."""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen: return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(v, seen) for v in value)
+    if isinstance(value, Future):
+        # 완료된 Future 가 잡고 있는 결과(카드 PNG 등)도 세션 메모리로 계산
+        return size + (estimate_size(value.result(), seen) if value.done() and value.exception() is None else 0)
+    slots = getattr(type(value), "__slots__", None)
+    if slots:
+        return size + sum(estimate_size(getattr(value, name, None), seen) for name in slots)
+    if hasattr(value, "__dict__"):
+        return size + estimate_size(vars(value), seen)
+    return size
+
+
+class SessionBudget:
+    """세션 하나의 바이트 예산. 넘치면 다시 만들 수 있는 값부터 버리고, 그래도 넘치면 오래된 대화를 정리합니다."""
+
+    def __init__(self, max_bytes: int, droppable: Iterable[str] = (), trim_key: Optional[str] = None, keep_items: int = 10):
+        self.max_bytes = max_bytes
+        self.droppable = list(droppable)   # 버려도 다시 만들 수 있는 키 (앞쪽부터 버림)
+        self.trim_key = trim_key           # 오래된 항목부터 잘라낼 리스트 키 (채팅 기록)
+        self.keep_items = keep_items
+
+    def usage(self, state: MutableMapping) -> Dict[str, int]:
+        seen: set = set()
+        return {str(k): estimate_size(state[k], seen) for k in list(state.keys())}
+
+    def enforce(self, state: MutableMapping) -> Dict[str, int]:
+        """예산을 맞추고 {"bytes": 정리 후 크기, "dropped": 버린 키 수, "trimmed": 잘라낸 항목 수} 를 돌려줍니다."""
+        total = sum(self.usage(state).values())
+        dropped = trimmed = 0
+        for key in self.droppable:
+            if total <= self.max_bytes: break
+            if state.get(key) is not None:
+                state[key] = None
+                dropped += 1
+                total = sum(self.usage(state).values())
+        items = state.get(self.trim_key) if self.trim_key else None
+        while total > self.max_bytes and items and len(items) > self.keep_items:
+            # 한 번에 user/assistant 한 쌍씩 정리
+            cut = min(2, len(items) - self.keep_items)
+            del items[:cut]
+            trimmed += cut
+            total = sum(self.usage(state).values())
+        return {"bytes": total, "dropped": dropped, "trimmed": trimmed}
+
+
+class SessionRegistry:
+    """프로세스의 세션별 상주 메모리 (한 파드에 동시 사용자를 몇 명 받을 수 있는지 가늠용)."""
+
+    def __init__(self, idle_ttl: float = 3600.0):
+        self.idle_ttl = idle_ttl
+        self._sessions: Dict[str, List[float]] = {}  # session_id -> [bytes, last_seen]
+        self._lock = threading.Lock()
+
+    def update(self, session_id: str, size: int):
+        with self._lock:
+            self._sessions[session_id] = [size, time.time()]
+
+    def prune(self, is_active: Optional[Callable[[str], bool]] = None):
+        """끊긴 세션과 idle_ttl 동안 보이지 않은 세션을 집계에서 뺍니다."""
+        now = time.time()
+        with self._lock:
+            for sid in list(self._sessions):
+                if now - self._sessions[sid][1] > self.idle_ttl or (is_active is not None and not is_active(sid)):
+                    del self._sessions[sid]
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            sizes = sorted(size for size, _ in self._sessions.values())
+        total = sum(sizes)
+        stats = {
+            "sessions": len(sizes), "total_bytes": total,
+            "avg_bytes": total / len(sizes) if sizes else 0.0,
+            "p95_bytes": sizes[int(0.95 * (len(sizes) - 1))] if sizes else 0,
+            "max_bytes": sizes[-1] if sizes else 0,
+        }
+        try:
+            import resource
+            stats["process_max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:  # Windows
+            pass
+        return stats
+
+
+session_registry = SessionRegistry()
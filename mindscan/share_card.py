@@ -0,0 +1,216 @@
+from functools import lru_cache
+from concurrent.futures import Future
+from typing import Dict, Optional, Sequence
+
+from PIL import Image, ImageDraw
+
+from mindscan.card_cache import CardCache, card_key
+from mindscan.fonts import get_font
+from mindscan.image_export import ExportedImage, ExportSpec, card_variants_from_env, export_variants
+from mindscan.profile import Profile
+from mindscan.qr_service import qr_service
+from mindscan.render_pool import RenderPool
+from mindscan.text_layout import wrap_text
+
+# 카드 레이아웃/디자인이 바뀌면 올려서 이전에 캐시된 카드를 무효화합니다.
+TEMPLATE_VERSION = "4"
+
+SERVICE_URL = "https://mind-scan.ai.kr"
+# 성향 분석 결과 카드 제목 (앱과 일괄 실행 CLI 가 같은 캐시 키를 쓰도록 공유)
+RESULT_CARD_TITLE = "마인드스캔 분석 결과"
+# 카드 우측 하단에 넣는 서비스 QR (흰 카드 위 보라색)
+CARD_QR_OPTIONS = {"box_size": 4, "border": 1, "fill_color": "#764ba2", "back_color": "white"}
+
+# 변형 이름 -> 인코딩된 카드 이미지 ("full": 저장용 원본 크기, "thumb": 화면 미리보기)
+CardImages = Dict[str, ExportedImage]
+
+
+# ==========================================
+# [보조 함수] 그라데이션 이미지 생성
+# ==========================================
+def create_gradient_image(width, height, start_color, end_color):
+    """주어진 크기와 색상으로 그라데이션 이미지를 생성합니다."""
+    base = Image.new('RGB', (width, height), start_color)
+    top = Image.new('RGB', (width, height), end_color)
+    # 세로 방향 그라데이션이므로 1픽셀 폭의 마스크 한 줄만 계산하고 가로로 늘립니다.
+    column = Image.new('L', (1, height))
+    column.putdata([int(255 * (y / height)) for y in range(height)])
+    mask = column.resize((width, height), Image.NEAREST)
+    return Image.composite(top, base, mask)
+
+
+@lru_cache(maxsize=8)
+def _build_card_background(width, height, start_color, end_color, card_margin, card_radius, card_bg_color):
+    img = create_gradient_image(width, height, start_color, end_color)
+    draw = ImageDraw.Draw(img, 'RGBA')
+    card_box = [card_margin, card_margin, width - card_margin, height - card_margin]
+    draw.rounded_rectangle(card_box, radius=card_radius, fill=card_bg_color)
+    return img
+
+
+def get_card_background(width, height, start_color, end_color, card_margin, card_radius, card_bg_color):
+    """그라데이션 + 반투명 카드 배경을 프로세스 단위로 한 번만 만들고 복사본을 돌려줍니다."""
+    return _build_card_background(
+        width, height, start_color, end_color, card_margin, card_radius, tuple(card_bg_color)
+    ).copy()
+
+
+# ==========================================
+# [보조 함수] 카드 본문 레이아웃
+# ==========================================
+def layout_profile(profile: Profile, usable_width, font_title, font_body, font_body_b):
+    """파싱된 프로필을 (y 오프셋, 텍스트, 폰트, 제목 여부) 목록과 전체 높이로 배치합니다."""
+    blocks = []
+    current_y = 0
+
+    def add(text, font, is_title, step):
+        # 각 줄은 실제 픽셀 폭 기준으로 자동 줄바꿈
+        nonlocal current_y
+        for line in wrap_text(text, font, usable_width):
+            blocks.append((current_y, line.text, font, is_title))
+            current_y += step
+
+    # 프로필 항목(난이도, 강점 등)은 볼드체로 강조 (줄 간격은 폰트 크기의 약 1.5배)
+    field_lines = profile.field_lines()
+    for label, value in field_lines:
+        add(f"{label}: {value}", font_body_b, False, 48)
+    if field_lines: current_y += 30 # 문단 간격
+
+    for section in profile.sections:
+        if section.title:
+            current_y += 40 # 섹션 앞 간격
+            add(section.title, font_title, True, 60)
+        for line in section.body.split("\n"):
+            add(line, font_body, False, 48)
+        current_y += 30
+    return blocks, current_y
+
+
+# ==========================================
+# [핵심 클래스] 공유 및 이미지 관리
+# ==========================================
+class ShareManager:
+    def __init__(self, cache: Optional[CardCache] = None, pool: Optional[RenderPool] = None,
+                 variants: Optional[Sequence[ExportSpec]] = None):
+        self.cache = cache
+        self.pool = pool
+        self.variants = tuple(variants or card_variants_from_env())
+
+    def _variant_keys(self, title, target_name, profile: Profile) -> Dict[str, str]:
+        # 변형마다 따로 캐시 (형식/크기 설정이 바뀐 변형만 새로 만들어짐)
+        return {spec.name: card_key(title, target_name, profile.to_json(), f"{TEMPLATE_VERSION}/{spec.tag}")
+                for spec in self.variants}
+
+    def _cached(self, keys: Dict[str, str]) -> Optional[CardImages]:
+        if self.cache is None: return None
+        images = {}
+        for spec in self.variants:
+            data = self.cache.get(keys[spec.name])
+            if data is None: return None
+            images[spec.name] = ExportedImage.from_bytes(spec, data)
+        return images
+
+    def _store(self, keys: Dict[str, str], images: CardImages):
+        for name, image in images.items(): self.cache.put(keys[name], image.data)
+
+    def submit_result_image(self, title, target_name, profile: Profile) -> Future:
+        """카드 렌더링을 워커 풀에 맡기고 Future(CardImages)를 돌려줍니다 (캐시에 있으면 바로 완료)."""
+        keys = self._variant_keys(title, target_name, profile)
+        images = self._cached(keys)
+        if images is not None or self.pool is None:
+            future = Future()
+            future.set_result(images if images is not None else self.create_result_image(title, target_name, profile))
+            return future
+
+        render_key = card_key(title, target_name, profile.to_json(), "/".join([TEMPLATE_VERSION] + [spec.tag for spec in self.variants]))
+        future = self.pool.submit(render_key, title, target_name, profile, self.variants)
+        if self.cache is not None:
+            def _store(f):
+                if not f.cancelled() and f.exception() is None: self._store(keys, f.result())
+            future.add_done_callback(_store)
+        return future
+
+    def create_result_image(self, title, target_name, profile: Profile) -> CardImages:
+        """파싱된 프로필을 카드 이미지 변형들로 돌려줍니다. 같은 내용이면 캐시된 바이트를 그대로 씁니다."""
+        if self.cache is None:
+            return self._render_result_image(title, target_name, profile)
+        keys = self._variant_keys(title, target_name, profile)
+        images = self._cached(keys)
+        if images is None:
+            images = self._render_result_image(title, target_name, profile)
+            self._store(keys, images)
+        return images
+
+    def _render_result_image(self, title, target_name, profile) -> CardImages:
+        """레이아웃/그리기는 한 번만 하고, 그 결과에서 저장용/미리보기 변형을 인코딩합니다."""
+        return export_variants(self._draw_result_image(title, target_name, profile), self.variants)
+
+    def _draw_result_image(self, title, target_name, profile: Profile) -> Image.Image:
+        """프로필을 예쁜 그라데이션 카드 이미지로 그립니다 (원문을 다시 파싱하지 않고 구조 그대로 배치)."""
+        # 1. 디자인 및 크기 설정
+        width, height = 900, 1400   # 고해상도 이미지 크기
+        card_margin = 60            # 테두리 여백
+        card_radius = 40            # 카드 모서리 둥글기
+        content_margin = 50         # 카드 내부 텍스트 여백
+
+        # 색상 팔레트 (앱 테마 통일)
+        start_color = "#667eea"      # 연보라 (시작)
+        end_color = "#764ba2"        # 진보라 (끝)
+        card_bg_color = (255, 255, 255, 235) # 반투명 흰색 카드
+        text_color_point = "#764ba2" # 포인트 컬러 (제목 등)
+        text_color_main = "#333333"  # 본문 컬러
+        text_color_sub = "#666666"   # 부가 정보 컬러
+        line_color = "#eeeeee"       # 구분선
+
+        # 2. 폰트 로드 (프로세스 단위 레지스트리에서 한글 폰트를 찾아 재사용)
+        # 경로는 mindscan/fonts.py 의 FONT_CANDIDATES 또는 MINDSCAN_FONT_BOLD/REGULAR 환경변수로 지정
+        font_h1 = get_font("bold", 70)      # 대제목
+        font_h2 = get_font("bold", 45)      # 중제목/섹션명
+        font_body_b = get_font("bold", 32)  # 본문 볼드
+        font_body = get_font("regular", 32) # 본문 일반
+        font_footer = get_font("regular", 24) # 푸터
+
+        # 3. 레이아웃 계산 (그리기 전에 픽셀 폭 기준으로 한 번에 줄바꿈/높이 계산)
+        start_x = card_margin + content_margin
+        usable_width = width - (start_x * 2) # 텍스트가 들어갈 실제 너비
+        header_top = card_margin + content_margin + 20
+        body_top = header_top + 100 + 70 + 50  # 제목, 분석 대상, 구분선 아래
+        qr_image = qr_service.image(SERVICE_URL, **CARD_QR_OPTIONS)
+        footer_space = content_margin + qr_image.height + 20 # 본문과 푸터(QR 포함) 사이 확보 공간
+
+        blocks, body_height = layout_profile(profile, usable_width, font_h2, font_body, font_body_b)
+
+        # 내용이 길면 캔버스를 늘립니다 (배경 캐시 재사용을 위해 200px 단위로 올림)
+        needed = body_top + body_height + footer_space + card_margin
+        if needed > height:
+            height = height + -(-(needed - height) // 200) * 200
+
+        # 4. 배경 그리기 (그라데이션 + 반투명 카드) - 캐시된 배경을 복사해서 사용
+        img = get_card_background(width, height, start_color, end_color, card_margin, card_radius, card_bg_color)
+        draw = ImageDraw.Draw(img, 'RGBA')
+
+        # [상단 제목 및 정보]
+        current_y = header_top
+        draw.text((start_x, current_y), "🧠 마인드스캔 분석 결과", font=font_h1, fill=text_color_point)
+        current_y += 100
+        draw.text((start_x, current_y), f"분석 대상: {target_name} 님", font=font_h2, fill=text_color_main)
+        current_y += 70
+
+        # 구분선
+        draw.line([(start_x, current_y), (width - start_x, current_y)], fill=line_color, width=3)
+
+        # 5. 본문 그리기 (레이아웃 결과를 그대로 사용)
+        for offset_y, text, font, is_title in blocks:
+            fill = text_color_point if is_title else text_color_main
+            draw.text((start_x, body_top + offset_y), text, font=font, fill=fill)
+
+        # [푸터]
+        footer_text = f"Mind Scan AI - {SERVICE_URL}"
+        footer_y = height - card_margin - content_margin # 바닥에서 위치 계산
+        draw.text((start_x, footer_y), footer_text, font=font_footer, fill=text_color_sub)
+        qr_x = width - start_x - qr_image.width
+        qr_y = footer_y + 24 - qr_image.height  # QR 아래쪽을 푸터 글자 아래쪽에 맞춤
+        img.paste(qr_image, (qr_x, qr_y), qr_image)
+
+        # 6. 결과 반환 (인코딩은 image_export 에서 변형별로)
+        return img
@@ -0,0 +1,190 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# ==========================================
+# [공유 저장소] 여러 레플리카(파드/프로세스)가 함께 쓰는 상태
+# ==========================================
+# st.cache_resource 와 session_state 는 프로세스 안에만 있으므로, 레플리카를 늘리면 캐시는 파드마다 새로 데워지고
+# 다른 파드로 간 유저는 진행 중이던 세션을 잃습니다. 공유해야 하는 값(분석 캐시, 카드 이미지, 세션 스냅샷)은
+# 이름공간(namespace)별 바이트 저장소에 두고, 구현은 SharedStore 를 상속해 바꿀 수 있게 합니다.
+# 기본 구현은 모든 레플리카가 마운트한 같은 SQLite 파일 (MINDSCAN_SHARED_STORE=/shared/mindscan.db).
+
+
+class SharedStore:
+    """레플리카 간 공유 저장소 인터페이스. 값은 바이트이고 (namespace, key) 마다 만료 시각이 있습니다."""
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def count(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def get_json(self, namespace: str, key: str) -> Optional[Dict]:
+        data = self.get(namespace, key)
+        return json.loads(data) if data is not None else None
+
+    def set_json(self, namespace: str, key: str, value: Dict, ttl: float):
+        self.set(namespace, key, json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), ttl)
+
+    @staticmethod
+    def from_env() -> Optional["SharedStore"]:
+        """MINDSCAN_SHARED_STORE 에 SQLite 파일 경로가 있으면 그 저장소를, 없으면 None (공유하지 않음)."""
+        path = os.environ.get("MINDSCAN_SHARED_STORE")
+        if not path: return None
+        return SQLiteSharedStore(path, max_bytes=int(os.environ.get("MINDSCAN_SHARED_STORE_MB", "1024")) * 1024 * 1024)
+
+
+class SQLiteSharedStore(SharedStore):
+    """같은 파일을 마운트한 여러 프로세스/레플리카가 함께 쓰는 SQLite 저장소 (로컬 테스트와 단일 노드 배포용)."""
+
+    # 쓰기 이만큼마다 한 번 만료/용량 초과 항목을 정리 (매번 하면 쓰기가 느려짐)
+    PRUNE_EVERY = 64
+
+    def __init__(self, path: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS shared_state_last_used ON shared_state (last_used)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드 간 공유하지 않고 스레드마다 하나씩 엽니다 (analysis_cache.SQLiteBackend 와 같음).
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _incr(self, name: str, amount: int = 1):
+        with self._lock: self.stats[name] += amount
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, expires_at FROM shared_state WHERE namespace = ? AND key = ?",
+                               (namespace, key)).fetchone()
+            if row is not None and row[1] >= now:
+                with conn:
+                    conn.execute("UPDATE shared_state SET last_used = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+        except sqlite3.Error:
+            # 공유 저장소 장애는 캐시 미스로 처리 (각 레플리카는 자기 메모리 캐시로 계속 동작)
+            self._incr("errors")
+            return None
+        if row is None or row[1] < now:
+            self._incr("misses")
+            return None
+        self._incr("hits")
+        return bytes(row[0])
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float):
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO shared_state (namespace, key, value, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, sqlite3.Binary(value), now + ttl, now),
+                )
+        except sqlite3.Error:
+            self._incr("errors")
+            return
+        with self._lock:
+            self.stats["writes"] += 1
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune: self.prune()
+
+    def delete(self, namespace: str, key: str):
+        try:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error:
+            self._incr("errors")
+
+    def prune(self):
+        """만료된 항목을 지우고, 전체 크기가 max_bytes 를 넘으면 오래 안 쓴 항목부터 지웁니다."""
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM shared_state WHERE expires_at < ?", (time.time(),))
+                total = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM shared_state").fetchone()[0]
+                if total <= self.max_bytes: return
+                evicted = 0
+                for namespace, key, size in conn.execute(
+                        "SELECT namespace, key, LENGTH(value) FROM shared_state ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes: break
+                    conn.execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+                    total -= size
+                    evicted += 1
+            self._incr("evictions", evicted)
+        except sqlite3.Error:
+            self._incr("errors")
+
+    def count(self, namespace: str) -> int:
+        try:
+            return self._conn().execute("SELECT COUNT(*) FROM shared_state WHERE namespace = ?", (namespace,)).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["hits"] + stats["misses"]
+        return {**stats, "hit_rate": stats["hits"] / total if total else 0.0}
+
+
+# ==========================================
+# [세션 이어하기] 세션 토큰 -> 진행 중인 세션 스냅샷
+# ==========================================
+class SessionArchive:
+    """진행 중인 세션(대상/분석/대화)을 토큰으로 저장해 두고, 어느 레플리카에서든 같은 토큰으로 이어갑니다."""
+
+    NAMESPACE = "sessions"
+
+    def __init__(self, store: SharedStore, ttl: float = 24 * 3600):
+        self.store = store
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls, store: Optional[SharedStore]) -> Optional["SessionArchive"]:
+        if store is None: return None
+        return cls(store, ttl=float(os.environ.get("MINDSCAN_SESSION_TTL_HOURS", "24")) * 3600)
+
+    @staticmethod
+    def new_token() -> str:
+        return secrets.token_urlsafe(16)
+
+    def save(self, token: str, data: Dict):
+        self.store.set_json(self.NAMESPACE, token, data, self.ttl)
+
+    def load(self, token: str) -> Optional[Dict]:
+        try:
+            return self.store.get_json(self.NAMESPACE, token)
+        except ValueError:  # 깨진 스냅샷은 없는 것으로 처리
+            return None
+
+    def discard(self, token: str):
+        self.store.delete(self.NAMESPACE, token)
@@ -0,0 +1,58 @@
+import hashlib
+import html
+import os
+from functools import lru_cache
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+# Streamlit 정적 파일 제공 (server.enableStaticServing): <앱 폴더>/static/* -> /app/static/*
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+STATIC_URL = "app/static"
+FONT_STYLESHEET = "https://fonts.googleapis.com/css2?family=Noto+Sans+KR:wght@300;400;500;600;700;800&display=swap"
+ADSENSE_SCRIPT = "https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js"
+
+
+class StaticAsset(NamedTuple):
+    name: str    # static/ 아래 상대 경로
+    text: str
+    digest: str  # 내용 해시 (URL에 붙여 파일이 바뀔 때만 브라우저 캐시를 무효화)
+
+    @property
+    def url(self) -> str:
+        return f"{STATIC_URL}/{self.name}?v={self.digest}"
+
+
+@lru_cache(maxsize=None)
+def load_asset(name: str) -> StaticAsset:
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        text = f.read()
+    return StaticAsset(name, text, hashlib.sha256(text.encode("utf-8")).hexdigest()[:12])
+
+
+@lru_cache(maxsize=None)
+def theme_html(name: str, serve_static: bool) -> str:
+    """테마 CSS 태그. 정적 제공이 켜져 있으면 짧은 <link> 만 보내고, 꺼져 있으면 인라인 <style> 로 대체합니다."""
+    fonts = f'<link href="{FONT_STYLESHEET}" rel="stylesheet">'
+    if serve_static:
+        return f'{fonts}<link href="{load_asset(name).url}" rel="stylesheet">'
+    return f"{fonts}<style>{load_asset(name).text}</style>"
+
+
+def ad_iframe_src(client_id: str, slot_id: str, width: int, height: int, base_url_path: str = "") -> str:
+    """static/ad.html 주소. 같은 광고는 항상 같은 URL이라 rerun 때 iframe 이 다시 로드되지 않습니다.
+
+    st.iframe 은 "/" 로 시작해야 주소로 보므로(아니면 HTML 로 취급) server.baseUrlPath 를 붙인 절대 경로로 돌려줍니다.
+    """
+    query = urlencode({"client": client_id, "slot": slot_id, "w": width, "h": height})
+    base = base_url_path.strip("/")
+    return f"{'/' + base if base else ''}/{load_asset('ad.html').url}&{query}"
+
+
+def ad_srcdoc(client_id: str, slot_id: str, width: int, height: int) -> str:
+    """정적 제공이 꺼져 있을 때 st.iframe 에 HTML 로 넣을 광고 (기존 방식)."""
+    client, slot = html.escape(client_id), html.escape(slot_id)
+    return (
+        f'<div style="display:flex;justify-content:center;"><script async src="{ADSENSE_SCRIPT}?client={client}" crossorigin="anonymous"></script>'
+        f'<ins class="adsbygoogle" style="display:inline-block;width:{width}px;height:{height}px" data-ad-client="{client}" data-ad-slot="{slot}"></ins>'
+        f'<script>(adsbygoogle = window.adsbygoogle || []).push({{}});</script></div>'
+    )
@@ -0,0 +1,135 @@
+import unicodedata
+import weakref
+from typing import Dict, List, NamedTuple
+
+# ==========================================
+# [텍스트 레이아웃] 픽셀 폭 기준 줄바꿈
+# ==========================================
+# 앞 글자에 붙어서 한 덩어리(그래핌)로 취급할 문자들 (이모지 변형 선택자, ZWJ, 피부색 등)
+_JOINERS = {"\u200d", "\ufe0e", "\ufe0f"}
+_ZWJ = "\u200d"
+
+# 줄 맨 앞에 오면 안 되는 문자 (닫는 괄호/문장부호)
+_NO_LINE_START = set(".,!?:;)]}%」』）】〉》、。，．！？：；…~")
+# 줄 맨 끝에 오면 안 되는 문자 (여는 괄호)
+_NO_LINE_END = set("([{「『（【〈《#")
+
+
+class LayoutLine(NamedTuple):
+    text: str
+    width: float
+
+
+def _is_attached(ch: str) -> bool:
+    if ch in _JOINERS: return True
+    if "\U0001F3FB" <= ch <= "\U0001F3FF": return True  # 피부색 수정자
+    return unicodedata.combining(ch) != 0
+
+
+def _is_cjk(ch: str) -> bool:
+    """글자 단위로 줄을 나눌 수 있는 CJK 문자인지 확인합니다."""
+    code = ord(ch)
+    return (
+        0xAC00 <= code <= 0xD7A3      # 한글 음절
+        or 0x1100 <= code <= 0x11FF   # 한글 자모
+        or 0x3130 <= code <= 0x318F   # 한글 호환 자모
+        or 0x3040 <= code <= 0x30FF   # 히라가나/가타카나
+        or 0x4E00 <= code <= 0x9FFF   # CJK 통합 한자
+        or 0x3000 <= code <= 0x303F   # CJK 기호/문장부호
+        or 0xFF00 <= code <= 0xFFEF   # 전각 문자
+    )
+
+
+def split_clusters(text: str) -> List[str]:
+    """이모지 ZWJ 시퀀스, 결합 문자 등을 쪼개지 않도록 글자 덩어리로 나눕니다."""
+    clusters: List[str] = []
+    for ch in text:
+        if clusters and (_is_attached(ch) or clusters[-1].endswith(_ZWJ)):
+            clusters[-1] += ch
+        else:
+            clusters.append(ch)
+    return clusters
+
+
+class GlyphMetrics:
+    """폰트별 글자 폭(advance)을 한 번만 측정해서 재사용합니다."""
+
+    def __init__(self, font):
+        self.font = font
+        self._advances: Dict[str, float] = {}
+
+    def advance(self, cluster: str) -> float:
+        width = self._advances.get(cluster)
+        if width is None:
+            try:
+                width = self.font.getlength(cluster)
+            except AttributeError:  # 오래된 Pillow / 비트맵 폰트
+                left, _, right, _ = self.font.getbbox(cluster)
+                width = right - left
+            self._advances[cluster] = width
+        return width
+
+    def measure(self, text: str) -> float:
+        return sum(self.advance(c) for c in split_clusters(text))
+
+
+_metrics_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_metrics(font) -> GlyphMetrics:
+    """폰트 객체마다 하나의 GlyphMetrics를 공유합니다 (폰트는 레지스트리에서 재사용됨)."""
+    metrics = _metrics_cache.get(font)
+    if metrics is None:
+        metrics = _metrics_cache[font] = GlyphMetrics(font)
+    return metrics
+
+
+def wrap_text(text: str, font, max_width: float) -> List[LayoutLine]:
+    """측정한 픽셀 폭 기준으로 한 번에 줄을 나눕니다.
+
+    공백에서 우선 줄을 바꾸고, 한 단어가 너무 길면 CJK 문자 사이(또는 불가피하면
+    아무 글자 사이)에서 나눕니다. 닫는 문장부호가 줄 맨 앞에 오지 않게 합니다.
+    """
+    metrics = get_metrics(font)
+    lines: List[LayoutLine] = []
+    clusters = split_clusters(" ".join(text.split()))
+    widths = [metrics.advance(c) for c in clusters]
+
+    start = 0
+    while start < len(clusters):
+        width = 0.0
+        end = start
+        space_break = cjk_break = -1  # 마지막으로 줄을 나눌 수 있는 위치
+        while end < len(clusters):
+            cluster = clusters[end]
+            if width + widths[end] > max_width and end > start:
+                break
+            width += widths[end]
+            if cluster == " ":
+                space_break = end
+            nxt = clusters[end + 1] if end + 1 < len(clusters) else ""
+            if nxt and (_is_cjk(cluster[0]) or _is_cjk(nxt[0])) \
+                    and nxt[0] not in _NO_LINE_START and cluster[-1] not in _NO_LINE_END:
+                cjk_break = end + 1
+            end += 1
+
+        if end < len(clusters):
+            if clusters[end] == " ":
+                cut = end
+            elif space_break > start:
+                cut = space_break
+            elif cjk_break > start:
+                cut = cjk_break
+            else:
+                cut = end
+        else:
+            cut = end
+
+        last = cut
+        while last > start and clusters[last - 1] == " ":
+            last -= 1
+        lines.append(LayoutLine("".join(clusters[start:last]), sum(widths[start:last])))
+        start = cut
+        while start < len(clusters) and clusters[start] == " ":
+            start += 1
+    return lines